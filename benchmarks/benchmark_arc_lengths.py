@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+#coding=utf-8
+# Counts the closest-point Newton iterations per contour point and fitting
+# step when each point's search starts from the nearest profile node at every
+# step (as before) and when it starts from the arc length the point had at
+# the previous step, for the sequence/ images and a slowly drifting sequence
+# made from test_images/, with and without warm starting.
+#
+# Usage:
+#     python benchmarks/benchmark_arc_lengths.py
+from __future__ import print_function
+import timeit
+
+import matplotlib
+matplotlib.use('Agg')
+
+from sample_images import sequence_images, drifting_images, sample_tolerances, sample_setup, load_drop, extract_drop
+from modules.classes import DropData
+from modules import fit_data
+from modules.fit_data import fit_experimental_drop
+from modules.initialise_parameters import initialise_parameters
+from modules.warm_start import WarmStart
+
+import numpy as np
+
+N_DRIFTING_FRAMES = 10
+
+# returns [Newton iterations per point at each step of each frame, LM steps,
+# fitted parameters, time] over the frames
+def fit_sequence(frames, warm_start):
+    tolerances = sample_tolerances()
+    drop_data = DropData()
+    newton_iterations = []
+    steps = 0
+    params = []
+    time_start = timeit.default_timer()
+    for experimental_drop, user_inputs in frames:
+        if warm_start is None:
+            initialise_parameters(experimental_drop, drop_data)
+        else:
+            warm_start.initialise_parameters(experimental_drop, drop_data, tolerances)
+        fit_experimental_drop(experimental_drop, drop_data, user_inputs, tolerances)
+        if warm_start is not None:
+            warm_start.update(drop_data)
+        newton_iterations.append(drop_data.newton_iterations_per_step)
+        steps += drop_data.fitting_steps
+        params.append(np.array(drop_data.params))
+    return [newton_iterations, steps, np.array(params), timeit.default_timer() - time_start]
+
+def main():
+    sequences = [
+        ('sequence/', [(load_drop(filename, sample_setup(regions)), sample_setup(regions)) for filename, regions in sequence_images()]),
+        ('drifting', [(extract_drop(image, sample_setup(regions)), sample_setup(regions)) for image, regions in drifting_images(N_DRIFTING_FRAMES)]),
+    ]
+    results = []
+    for sequence_name, frames in sequences:
+        for warm_start_name in ['off', 'on']:
+            for seeds_name, reuse in [['profile node', False], ['previous step', True]]:
+                fit_data.REUSE_ARC_LENGTHS = reuse
+                warm_start = WarmStart() if warm_start_name == 'on' else None
+                results.append([sequence_name, warm_start_name, seeds_name, fit_sequence(frames, warm_start)])
+    fit_data.REUSE_ARC_LENGTHS = True
+    print()
+    print("| Sequence   | Warm start | Seeds         | Newton/point/step (mean) | first step | later steps | LM steps | Time (s) | max param change |")
+    for i, (sequence_name, warm_start_name, seeds_name, (newton_iterations, steps, params, time_taken)) in enumerate(results):
+        baseline_params = results[i - i % 2][3][2]
+        first_steps = [frame[0] for frame in newton_iterations] # not seeded from a previous step
+        later_steps = [iterations for frame in newton_iterations for iterations in frame[1:]]
+        print("| %-10s | %-10s | %-13s | %24.2f | %10.2f | %11.2f | %8d | %8.3f | %16.2e |" % (
+            sequence_name, warm_start_name, seeds_name, np.mean(first_steps + later_steps), np.mean(first_steps),
+            np.mean(later_steps), steps, time_taken, np.max(np.abs(params - baseline_params))))
+
+if __name__ == '__main__':
+    main()
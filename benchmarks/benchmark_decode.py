@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+#coding=utf-8
+# Times decoding and edge extraction of the sequence/ images as three-channel
+# BGR, as read_image did before, against decoding straight to gray, and
+# reports the memory each frame holds once its profiles are extracted (the
+# full BGR frame was kept, now only the contours are). Also times the reduced
+# size decoding used for selecting the regions.
+from __future__ import print_function
+import timeit
+
+from sample_images import sequence_images, sample_setup
+
+import cv2
+import numpy as np
+
+from modules.classes import ExperimentalDrop
+from modules.extract_profile import extract_drop_profile
+from modules.read_image import read_image_file
+
+REPEATS = 5
+
+# decodes filename with flag and extracts the profiles, keeping the image on
+# the drop if keep_image
+def decode_and_extract(filename, flag, user_inputs, keep_image):
+    experimental_drop = ExperimentalDrop()
+    experimental_drop.image = cv2.imread(filename, flag)
+    image = experimental_drop.image
+    extract_drop_profile(experimental_drop, user_inputs)
+    if keep_image:
+        experimental_drop.image = image
+    return experimental_drop
+
+# bytes of the arrays a drop holds after extraction
+def retained_bytes(experimental_drop):
+    arrays = [experimental_drop.image, experimental_drop.drop_data] + list(experimental_drop.needle_data)
+    return sum(array.nbytes for array in arrays if array is not None)
+
+def main():
+    frames = sequence_images()
+    user_inputs = sample_setup(frames[0][1])
+    print("| Decoding              | Decode (ms) | Decode + extract (ms) | Frame (kB) | Kept after extraction (kB) |")
+    for name, flag, keep_image in [["BGR, image kept", 1, True], ["gray, image released", 0, False]]:
+        decode_time = min(timeit.repeat(lambda: [cv2.imread(filename, flag) for filename, regions in frames], number=1, repeat=REPEATS)) / len(frames)
+        total_time = min(timeit.repeat(lambda: [decode_and_extract(filename, flag, user_inputs, keep_image) for filename, regions in frames], number=1, repeat=REPEATS)) / len(frames)
+        frame_bytes = np.mean([cv2.imread(filename, flag).nbytes for filename, regions in frames])
+        kept_bytes = np.mean([retained_bytes(decode_and_extract(filename, flag, user_inputs, keep_image)) for filename, regions in frames])
+        print("| %-21s | %11.2f | %21.2f | %10.0f | %26.1f |" % (name, 1000 * decode_time, 1000 * total_time, frame_bytes / 1024., kept_bytes / 1024.))
+    print()
+    print("| Preview decoding (gray) | Decode (ms) | Frame (kB) |")
+    for reduction in [1, 2, 4, 8]:
+        decode_time = min(timeit.repeat(lambda: [read_image_file(filename, 0, reduction) for filename, regions in frames], number=1, repeat=REPEATS)) / len(frames)
+        frame_bytes = np.mean([read_image_file(filename, 0, reduction).nbytes for filename, regions in frames])
+        print("| 1/%-21d | %11.2f | %10.0f |" % (reduction, 1000 * decode_time, frame_bytes / 1024.))
+
+if __name__ == '__main__':
+    main()
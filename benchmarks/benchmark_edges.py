@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+#coding=utf-8
+# Times the contour post-processing of extract_profile.detect_edges against the
+# per-point loop it replaced, on the full frame of every image in test_images/
+# (the largest region a user can select) and on the drop regions of the
+# benchmark images.
+from __future__ import print_function
+import glob
+import os
+import timeit
+
+from sample_images import PATH_TO_SCRIPT, test_images
+
+import cv2
+import numpy as np
+
+from modules.classes import ExperimentalDrop
+from modules.extract_profile import detect_edges, image_crop, BLUR_SIZE, VERSION_CV2
+
+REPEATS = 5
+
+# the previous detect_edges: full contour hierarchy, cv2.arcLength of every
+# contour and a Python loop over the points of the returned contours
+def detect_edges_per_point(image, raw_experiment, points, ret, n_contours):
+    if len(image.shape) != 2:
+        image = cv2.cvtColor(image,cv2.COLOR_BGR2GRAY)
+    blur = cv2.GaussianBlur(image,(BLUR_SIZE,BLUR_SIZE),0)
+    if ret == -1:
+        ret, thresh = cv2.threshold(blur,0,255,cv2.THRESH_BINARY+cv2.THRESH_OTSU)
+    edges = cv2.Canny(blur,0.5*ret,ret)
+    if float(VERSION_CV2[0]) > 2:
+        _,contours, hierarchy = cv2.findContours(edges,cv2.RETR_TREE,cv2.CHAIN_APPROX_NONE)
+    else:
+        contours, hierarchy = cv2.findContours(edges,cv2.RETR_TREE,cv2.CHAIN_APPROX_NONE)
+    contour_lengths = []
+    for contour in contours:
+      length = cv2.arcLength(contour,0)
+      contour_lengths.append(length)
+    indexed_contour_lengths = np.array(contour_lengths).argsort()[::-1]
+    indexed_contours_to_return = indexed_contour_lengths[:n_contours]
+    image_height = raw_experiment.image.shape[0]
+    offset = [points[0][0], image_height - points[0][1]]
+    points = []
+    for index in indexed_contours_to_return:
+        current_contour = contours[index][:,0]
+        for i in range(current_contour.shape[0]):
+            current_contour[i,1] = - current_contour[i,1]
+            current_contour[i,:] = current_contour[i,:] + offset
+        points.append(current_contour[current_contour[:,1].argsort()])
+    return points, ret
+
+def same_contours(points_a, points_b):
+    return (len(points_a) == len(points_b)) and all(np.array_equal(a, b) for a, b in zip(points_a, points_b))
+
+def regions_to_time():
+    regions = []
+    for filename in sorted(glob.glob(os.path.join(PATH_TO_SCRIPT, 'test_images', '*.png'))):
+        image = cv2.imread(filename, 1)
+        height, width = image.shape[:2]
+        regions.append((os.path.basename(filename) + " (full frame)", image, [(0., 0.), (float(width), float(height))]))
+    for filename, (drop_region, needle_region) in test_images():
+        regions.append((os.path.basename(filename) + " (drop)", cv2.imread(filename, 1), drop_region))
+    return regions
+
+def main():
+    print("| Region                                  | Contours | per-point (ms) | vectorized (ms) | speed-up | same |")
+    for name, image, region in regions_to_time():
+        raw_experiment = ExperimentalDrop()
+        raw_experiment.image = image
+        raw_experiment.image_height = image.shape[0]
+        crop = image_crop(image, region)
+        for n_contours in [1, 2]:
+            def run(function):
+                return function(crop, raw_experiment, region, -1, n_contours)
+            time_loop = min(timeit.repeat(lambda: run(detect_edges_per_point), number=1, repeat=REPEATS))
+            time_vectorized = min(timeit.repeat(lambda: run(detect_edges), number=1, repeat=REPEATS))
+            same = same_contours(run(detect_edges_per_point)[0], run(detect_edges)[0])
+            print("| %-39s | %8d | %14.1f | %15.1f | %8.2f | %4s |" % (name, n_contours, 1000 * time_loop, 1000 * time_vectorized, time_loop / time_vectorized, "yes" if same else "no"))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+#coding=utf-8
+# Times one Levenberg--Marquardt--Fletcher iteration (Jacobian, residuals and
+# normal equations) against the number of contour points.
+#
+# Usage:
+#     python benchmarks/benchmark_jacobian.py
+from __future__ import print_function
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+import numpy as np
+
+from modules.classes import DropData, Tolerances
+from modules.fit_data import calculate_A_v_S
+from modules.jacobian import rowJacobian
+
+CONTOUR_LENGTHS = [500, 1000, 2000, 4000, 8000]
+REPEATS = 3
+PARAMS = [640., 300., 160., 0.22, 0.01]
+MAX_ARCLENGTH = 3.0
+NOISE_PX = 0.3
+
+class SyntheticDrop(object):
+    def __init__(self, drop_data):
+        self.drop_data = drop_data
+
+# builds a noisy pendant drop contour with n_points from the theoretical profile
+def synthetic_contour(n_points):
+    drop_data = DropData()
+    drop_data.params = PARAMS
+    drop_data.max_s = 4.0
+    [xP, yP, RP, BP, wP] = PARAMS
+    n_side = n_points // 2
+    s_values = np.linspace(0.01, MAX_ARCLENGTH, n_side)
+    profile = np.array([drop_data.profile(s)[:2] for s in s_values])
+    left = np.column_stack((xP - RP * profile[:, 0], yP + RP * profile[:, 1]))
+    right = np.column_stack((xP + RP * profile[:, 0], yP + RP * profile[:, 1]))
+    points = np.concatenate((left, right))
+    points = points + np.random.RandomState(0).normal(0, NOISE_PX, points.shape)
+    return points[points[:, 1].argsort()]
+
+# the per-point assembly of the normal equations previously used in fit_data
+def calculate_A_v_S_per_row(experimental_drop, drop_data, tolerances):
+    lenpoints = len(experimental_drop.drop_data)
+    m_parameters = len(drop_data.params)
+    A = np.zeros((m_parameters, m_parameters))
+    v = np.zeros((m_parameters, 1))
+    S = 0.0
+    for i in range(0, lenpoints):
+        x, y = experimental_drop.drop_data[i]
+        JACrowi, residual = rowJacobian(x, y, drop_data, tolerances)
+        S += residual**2
+        for j in range(0, m_parameters):
+            v[j] += JACrowi[j] * residual
+            for k in range(0, j+1):
+                A[j][k] += JACrowi[j] * JACrowi[k]
+    for j in range(0, m_parameters):
+        for k in range(j, m_parameters):
+            A[j][k] = A[k][j]
+    return [A, v, S]
+
+# the batched assembly used by fit_data
+def calculate_A_v_S_batched(experimental_drop, drop_data, tolerances):
+    return calculate_A_v_S(experimental_drop.drop_data, drop_data, tolerances)
+
+def time_iteration(function, experimental_drop, drop_data, tolerances):
+    def iteration():
+        drop_data.s_left = 0.05 * drop_data.max_s
+        drop_data.s_right = 0.05 * drop_data.max_s
+        function(experimental_drop, drop_data, tolerances)
+    return min(timeit.repeat(iteration, number=1, repeat=REPEATS))
+
+def main():
+    tolerances = Tolerances(1.e-6, 1.e-6, 10, 1.e-4, 1.e-6, 10, 1.e-4, 20)
+    print("| Points | per-row (ms) | batched (ms) | speed-up |")
+    for n_points in CONTOUR_LENGTHS:
+        experimental_drop = SyntheticDrop(synthetic_contour(n_points))
+        drop_data = DropData()
+        drop_data.params = PARAMS
+        drop_data.max_s = 4.0
+        time_row = time_iteration(calculate_A_v_S_per_row, experimental_drop, drop_data, tolerances)
+        time_batched = time_iteration(calculate_A_v_S_batched, experimental_drop, drop_data, tolerances)
+        print("| %6d | %12.1f | %12.1f | %8.2f |" % (n_points, 1000 * time_row, 1000 * time_batched, time_row / time_batched))
+
+if __name__ == '__main__':
+    main()
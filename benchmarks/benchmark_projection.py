@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+#coding=utf-8
+# Compares the closest-point searches of the fit: Newton iterations from a
+# starting arc length ("newton") against projection onto a sampled profile
+# ("kdtree"). Times one Jacobian evaluation against the number of contour
+# points, with the profile samples rebuilt (as after a change of Bond number)
+# and reused, and reports the largest difference in arc length and residual.
+# Then fits the sequence/ and test_images/ drops with each search and reports
+# the time, LM steps, points whose Newton search did not converge and the
+# largest difference in fitted parameters.
+#
+# Usage:
+#     python benchmarks/benchmark_projection.py
+from __future__ import print_function
+import timeit
+
+import matplotlib
+matplotlib.use('Agg')
+
+from sample_images import test_images, sequence_images, sample_setup, load_drop
+from benchmark_jacobian import synthetic_contour, PARAMS
+from modules.classes import DropData, Tolerances
+from modules.fit_data import fit_experimental_drop
+from modules.initialise_parameters import initialise_parameters
+from modules.jacobian import fullJacobian, PROJECTIONS
+
+import numpy as np
+
+CONTOUR_LENGTHS = [500, 1000, 2000, 4000, 8000]
+REPEATS = 5
+
+def projection_tolerances(projection):
+    return Tolerances(1.e-6, 1.e-6, 10, 1.e-4, 1.e-6, 10, 1.e-4, 20, projection=projection)
+
+# returns [time with the profile samples rebuilt, time reusing them, arc
+# lengths, residuals] of a Jacobian evaluation of contour
+def time_jacobian(contour, projection):
+    tolerances = projection_tolerances(projection)
+    drop_data = DropData()
+    drop_data.params = PARAMS
+    drop_data.max_s = 4.0
+    def rebuilt():
+        drop_data.profile_index = None
+        return fullJacobian(contour, drop_data, tolerances)
+    def reused():
+        return fullJacobian(contour, drop_data, tolerances)
+    jacobian, residuals, s_i = rebuilt()
+    return [min(timeit.repeat(rebuilt, number=1, repeat=REPEATS)), min(timeit.repeat(reused, number=1, repeat=REPEATS)), s_i, residuals]
+
+# returns [fitted parameters, LM steps, points not converged, time] over the frames
+def fit_frames(frames, projection):
+    tolerances = projection_tolerances(projection)
+    drop_data = DropData()
+    params = []
+    steps = 0
+    failures = 0
+    time_start = timeit.default_timer()
+    for experimental_drop, user_inputs in frames:
+        initialise_parameters(experimental_drop, drop_data)
+        drop_data.arclength_failures = 0
+        fit_experimental_drop(experimental_drop, drop_data, user_inputs, tolerances)
+        params.append(np.array(drop_data.params))
+        steps += drop_data.fitting_steps
+        failures += drop_data.arclength_failures
+    return [np.array(params), steps, failures, timeit.default_timer() - time_start]
+
+def main():
+    print("| Points | Projection | rebuilt (ms) | reused (ms) | max s difference | max residual difference (px) |")
+    for n_points in CONTOUR_LENGTHS:
+        contour = synthetic_contour(n_points)
+        baseline = None
+        for projection in PROJECTIONS:
+            time_rebuilt, time_reused, s_i, residuals = time_jacobian(contour, projection)
+            if baseline is None:
+                baseline = [s_i, residuals]
+            print("| %6d | %-10s | %12.2f | %11.2f | %16.2e | %28.2e |" % (n_points, projection, 1000 * time_rebuilt, 1000 * time_reused,
+                np.max(np.abs(s_i - baseline[0])), np.max(np.abs(residuals - baseline[1]))))
+    print()
+    sequences = [
+        ('sequence/', [(load_drop(filename, sample_setup(regions)), sample_setup(regions)) for filename, regions in sequence_images()]),
+        ('test_images/', [(load_drop(filename, sample_setup(regions)), sample_setup(regions)) for filename, regions in test_images()]),
+    ]
+    results = []
+    for sequence_name, frames in sequences:
+        for projection in PROJECTIONS:
+            results.append([sequence_name, projection, fit_frames(frames, projection)])
+    print()
+    print("| Drops        | Projection | Time (s) | LM steps | Not converged | max param change |")
+    for i, (sequence_name, projection, (params, steps, failures, time_taken)) in enumerate(results):
+        baseline_params = results[i - i % len(PROJECTIONS)][2][0]
+        print("| %-12s | %-10s | %8.3f | %8d | %13d | %16.2e |" % (sequence_name, projection, time_taken, steps, failures,
+            np.max(np.abs(params - baseline_params))))
+
+if __name__ == '__main__':
+    main()
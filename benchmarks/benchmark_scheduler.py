@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+#coding=utf-8
+# Runs the frame scheduler with a fit slower than the frame interval, frame
+# by frame as opendrop.py's serial loop does and through the pipeline, and
+# reports for each overload policy the frames fitted, the missed deadlines
+# and the "Backlog (frames)" column. The serial loop fits each frame before
+# capturing the next, so its backlog column must read 0 throughout.
+#
+# Usage:
+#     python benchmarks/benchmark_scheduler.py
+from __future__ import print_function
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from modules.pipeline import Pipeline, QUEUE_SIZE
+from modules.scheduler import FrameScheduler, OVERLOAD_POLICIES
+
+N_FRAMES = 20
+WAIT_TIME = 0.02 # seconds between frames
+FIT_TIME = 0.03 # seconds taken to fit a frame
+
+# returns the backlog recorded for each frame fitted in the serial loop
+def run_serial(policy):
+    scheduler = FrameScheduler(WAIT_TIME, policy)
+    backlog = []
+    for i in scheduler.frames(N_FRAMES):
+        time.sleep(FIT_TIME)
+        scheduler.frame_fitted()
+        backlog.append(scheduler.backlog())
+    return [scheduler, backlog]
+
+# returns the backlog recorded for each frame fitted in the pipeline
+def run_pipeline(policy):
+    scheduler = FrameScheduler(WAIT_TIME, policy)
+    backlog = []
+    def fit(i):
+        time.sleep(FIT_TIME)
+        scheduler.frame_fitted()
+        backlog.append(scheduler.backlog())
+        return i
+    contour_queue_size = QUEUE_SIZE if policy == "drop" else 0
+    pipeline = Pipeline(scheduler.frames(N_FRAMES), [["fitting", fit]], [QUEUE_SIZE, contour_queue_size])
+    for i in pipeline.run():
+        pass
+    return [scheduler, backlog]
+
+def main():
+    print("| Loop     | Policy   | Fitted | Missed deadlines | Backlog column |")
+    for name, run in [["serial", run_serial], ["pipeline", run_pipeline]]:
+        for policy in OVERLOAD_POLICIES:
+            scheduler, backlog = run(policy)
+            print("| %-8s | %-8s | %6d | %16d | %s |" % (name, policy, len(backlog), scheduler.missed_deadlines, " ".join("%d" % frames for frames in backlog)))
+            if name == "serial":
+                assert all(frames == 0 for frames in backlog), "backlog recorded in the serial loop"
+            assert all(frames >= 0 for frames in backlog), "more frames fitted than captured"
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+#coding=utf-8
+# Fits the sequence/ and test_images/ drops with each least-squares solver
+# and reports the time, the steps, the evaluations of the residuals and
+# Jacobian (each a closest-point search over the contour) and the largest
+# difference in fitted parameters from the Levenberg--Marquardt--Fletcher fit.
+#
+# Usage:
+#     python benchmarks/benchmark_solvers.py
+from __future__ import print_function
+import timeit
+
+import matplotlib
+matplotlib.use('Agg')
+
+from sample_images import test_images, sequence_images, sample_setup, load_drop
+from modules.classes import DropData, Tolerances
+from modules.fit_data import fit_experimental_drop
+from modules.initialise_parameters import initialise_parameters
+
+import numpy as np
+
+SOLVERS = ["lmf", "gauss_newton", "dogleg", "least_squares", "variable_projection"]
+REPEATS = 3
+
+# returns [fitted parameters, steps, residual evaluations] over the frames
+def fit_frames(frames, solver):
+    tolerances = Tolerances(1.e-6, 1.e-6, 10, 1.e-4, 1.e-6, 10, 1.e-4, 20, solver=solver)
+    drop_data = DropData()
+    params = []
+    steps = 0
+    evaluations = 0
+    for experimental_drop, user_inputs in frames:
+        initialise_parameters(experimental_drop, drop_data)
+        drop_data.residual_evaluations = 0
+        fit_experimental_drop(experimental_drop, drop_data, user_inputs, tolerances)
+        params.append(np.array(drop_data.previous_params))
+        steps += drop_data.fitting_steps
+        evaluations += drop_data.residual_evaluations
+    return [np.array(params), steps, evaluations]
+
+def main():
+    sequences = [
+        ('sequence/', [(load_drop(filename, sample_setup(regions)), sample_setup(regions)) for filename, regions in sequence_images()]),
+        ('test_images/', [(load_drop(filename, sample_setup(regions)), sample_setup(regions)) for filename, regions in test_images()]),
+    ]
+    results = []
+    for sequence_name, frames in sequences:
+        for solver in SOLVERS:
+            time_taken = min(timeit.repeat(lambda: fit_frames(frames, solver), number=1, repeat=REPEATS))
+            results.append([sequence_name, solver, time_taken, fit_frames(frames, solver)])
+    print()
+    print("| Drops        | Solver              | Time (s) | Steps | Evaluations | max param change |")
+    for i, (sequence_name, solver, time_taken, (params, steps, evaluations)) in enumerate(results):
+        baseline_params = results[i - i % len(SOLVERS)][3][0]
+        print("| %-12s | %-19s | %8.3f | %5d | %11d | %16.2e |" % (sequence_name, solver, time_taken, steps, evaluations,
+            np.max(np.abs(params - baseline_params))))
+
+if __name__ == '__main__':
+    main()
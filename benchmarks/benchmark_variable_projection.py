@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+#coding=utf-8
+# Fits the sequence/ and test_images/ drops with the full five-parameter
+# Levenberg--Marquardt--Fletcher fit and with variable projection (Bond
+# number searched alone, the other parameters registered at each Bond number)
+# and reports, per frame, the integrations of the profile (misses of the
+# profile cache), the closest-point evaluations, the time and the largest
+# difference in fitted parameters.
+#
+# Usage:
+#     python benchmarks/benchmark_variable_projection.py
+from __future__ import print_function
+import os
+import timeit
+
+import matplotlib
+matplotlib.use('Agg')
+
+from sample_images import test_images, sequence_images, sample_setup, load_drop
+from modules.classes import DropData, Tolerances
+from modules.fit_data import fit_experimental_drop
+from modules.initialise_parameters import initialise_parameters
+
+import numpy as np
+
+SOLVERS = ["lmf", "variable_projection"]
+
+# returns [profile integrations, closest-point evaluations, time, fitted
+# parameters] of the drop fitted from its initial parameters
+def fit_frame(experimental_drop, user_inputs, solver):
+    tolerances = Tolerances(1.e-6, 1.e-6, 10, 1.e-4, 1.e-6, 10, 1.e-4, 20, solver=solver)
+    drop_data = DropData()
+    initialise_parameters(experimental_drop, drop_data)
+    time_start = timeit.default_timer()
+    fit_experimental_drop(experimental_drop, drop_data, user_inputs, tolerances)
+    time_taken = timeit.default_timer() - time_start
+    return [drop_data.profile_cache_misses, drop_data.residual_evaluations, time_taken, np.array(drop_data.previous_params)]
+
+def main():
+    frames = [(os.path.basename(filename), load_drop(filename, sample_setup(regions)), sample_setup(regions))
+              for filename, regions in sequence_images() + test_images()]
+    rows = []
+    for name, experimental_drop, user_inputs in frames:
+        rows.append([name] + [fit_frame(experimental_drop, user_inputs, solver) for solver in SOLVERS])
+    print()
+    print("| Frame                    | integrations LMF | VP | evaluations LMF | VP | time LMF (ms) | VP (ms) | max param change |")
+    for name, lmf, variable_projection in rows:
+        print("| %-24s | %16d | %2d | %15d | %2d | %13.1f | %7.1f | %16.2e |" % (name, lmf[0], variable_projection[0], lmf[1], variable_projection[1],
+            1000 * lmf[2], 1000 * variable_projection[2], np.max(np.abs(variable_projection[3] - lmf[3]))))
+    totals = np.sum([[lmf[0], variable_projection[0], lmf[1], variable_projection[1], lmf[2], variable_projection[2]] for name, lmf, variable_projection in rows], axis=0)
+    print("| %-24s | %16d | %2d | %15d | %2d | %13.1f | %7.1f |                  |" % ("total", totals[0], totals[1], totals[2], totals[3], 1000 * totals[4], 1000 * totals[5]))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+#coding=utf-8
+# Compares the number of Levenberg--Marquardt--Fletcher steps per frame with
+# and without warm starting from the previous frame, for the sequence/ images
+# and for a slowly drifting sequence made from test_images/.
+#
+# Usage:
+#     python benchmarks/benchmark_warm_start.py
+from __future__ import print_function
+import timeit
+
+import matplotlib
+matplotlib.use('Agg')
+
+from sample_images import sequence_images, drifting_images, sample_tolerances, sample_setup, load_drop, extract_drop
+from modules.classes import DropData
+from modules.fit_data import fit_experimental_drop
+from modules.initialise_parameters import initialise_parameters
+from modules.warm_start import WarmStart
+
+MODES = [('off', None), ('on', False), ('extrapolated', True)]
+
+N_DRIFTING_FRAMES = 10
+
+def fit_sequence(frames, warm_start):
+    tolerances = sample_tolerances()
+    drop_data = DropData()
+    steps = []
+    time_start = timeit.default_timer()
+    for experimental_drop, user_inputs in frames:
+        if warm_start is None:
+            initialise_parameters(experimental_drop, drop_data)
+        else:
+            warm_start.initialise_parameters(experimental_drop, drop_data, tolerances)
+        fit_experimental_drop(experimental_drop, drop_data, user_inputs, tolerances)
+        if warm_start is not None:
+            warm_start.update(drop_data)
+        steps.append(drop_data.fitting_steps)
+    return steps, timeit.default_timer() - time_start
+
+def main():
+    sequences = [
+        ('sequence/', [(load_drop(filename, sample_setup(regions)), sample_setup(regions)) for filename, regions in sequence_images()]),
+        ('drifting', [(extract_drop(image, sample_setup(regions)), sample_setup(regions)) for image, regions in drifting_images(N_DRIFTING_FRAMES)]),
+    ]
+    results = []
+    for sequence_name, frames in sequences:
+        for name, extrapolate in MODES:
+            if extrapolate is None:
+                results.append((sequence_name, name, fit_sequence(frames, None)))
+            else:
+                results.append((sequence_name, name, fit_sequence(frames, WarmStart(extrapolate))))
+    print()
+    print("| Sequence   | Warm start   | LM steps per frame            | Total | Time (s) |")
+    for sequence_name, name, (steps, time_taken) in results:
+        print("| %-10s | %-12s | %-29s | %5d | %8.3f |" % (sequence_name, name, " ".join(str(n) for n in steps), sum(steps), time_taken))
+
+if __name__ == '__main__':
+    main()
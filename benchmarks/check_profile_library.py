@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+#coding=utf-8
+# Checks the profile library against direct integration of the Young--Laplace
+# equations at Bond numbers between the library's grid points, where the
+# profile and its Bond sensitivities are interpolated. For each Bond number
+# the profile is compared up to the largest arc length the library covers,
+# and the largest error of x, y, phi and of their Bond sensitivities, relative
+# to values above 1, is reported. The library is built into a temporary
+# directory.
+#
+# Usage:
+#     python benchmarks/check_profile_library.py
+from __future__ import print_function
+import os
+import shutil
+import sys
+import tempfile
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'modules'))
+
+from de_YoungLaplace import ylderiv
+from profile_library import build_profile_library, load_profile_library, INTERPOLATION_TOL
+from scipy.integrate import odeint
+
+import numpy as np
+
+S_POINTS = 200 # points of the compared profiles, as DropData.s_points
+EXTRA_BOND_NUMBERS = [0.0101, 0.0499, 0.1003, 0.2507, 0.4001, 0.6011, 0.7993]
+COLUMNS = ["x", "y", "phi", "dx/dB", "dy/dB", "dphi/dB"]
+TOLERANCE = 10 * INTERPOLATION_TOL # checked at the interval midpoints only when the library is built
+
+# returns the largest error of each column of the library profile for
+# bond_number, relative to values above 1, compared up to arc length max_s
+def profile_errors(library, bond_number, max_s):
+    s_data_points = np.linspace(0, max_s, S_POINTS + 1)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        direct = odeint(ylderiv, [.000001, 0., 0., 0., 0., 0.], s_data_points, args=(bond_number,), rtol=1.e-10, atol=1.e-12)
+    interpolated = library.profile_data(bond_number, max_s, S_POINTS)
+    return np.max(np.abs(interpolated - direct) / np.maximum(np.abs(direct), 1), axis=0)
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        build_profile_library(directory)
+        library = load_profile_library(directory)
+        midpoints = library.bond_min + library.Delta_bond * (np.arange(0, library.profiles.shape[0] - 1, 10) + 0.5)
+        print("| Bond   | max_s | " + " | ".join("%9s" % column for column in COLUMNS) + " |")
+        worst = np.zeros(len(COLUMNS))
+        for bond_number in sorted(list(midpoints) + EXTRA_BOND_NUMBERS):
+            m1 = int((bond_number - library.bond_min) / library.Delta_bond)
+            max_s = library.valid_s[m1]
+            assert library.covers(bond_number, max_s)
+            errors = profile_errors(library, bond_number, max_s)
+            worst = np.maximum(worst, errors)
+            print("| %.4f | %5.2f | " % (bond_number, max_s) + " | ".join("%9.2e" % error for error in errors) + " |")
+        print("| worst  |       | " + " | ".join("%9.2e" % error for error in worst) + " |")
+        for column, error in zip(COLUMNS, worst):
+            assert error <= TOLERANCE, "%s off by %.2e where the library covers the profile" % (column, error)
+    finally:
+        shutil.rmtree(directory)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+#coding=utf-8
+# Drop and needle regions for the images shipped in test_images/ and
+# sequence/, shared by the benchmark scripts.
+import glob
+import os
+import sys
+
+PATH_TO_SCRIPT = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..')
+sys.path.insert(0, PATH_TO_SCRIPT)
+
+import cv2
+import numpy as np
+
+from modules.classes import ExperimentalSetup, ExperimentalDrop, Tolerances
+from modules.extract_profile import extract_drop_profile
+
+# [(min_x, min_y), (max_x, max_y)] in image pixels, as returned by user_ROI
+TEST_IMAGE_REGIONS = {
+    'glycerol_in_air.png': ([(290., 330.), (710., 760.)], [(400., 50.), (600., 250.)]),
+    'tetradecane_in_air.png': ([(520., 280.), (900., 720.)], [(600., 50.), (800., 230.)]),
+}
+SEQUENCE_REGIONS = ([(280., 200.), (740., 700.)], [(400., 20.), (600., 150.)])
+
+def test_images():
+    return [(os.path.join(PATH_TO_SCRIPT, 'test_images', name), regions) for name, regions in sorted(TEST_IMAGE_REGIONS.items())]
+
+def sequence_images():
+    return [(filename, SEQUENCE_REGIONS) for filename in sorted(glob.glob(os.path.join(PATH_TO_SCRIPT, 'sequence', '*.png')))]
+
+def sample_tolerances():
+    return Tolerances(1.e-6, 1.e-6, 10, 1.e-4, 1.e-6, 10, 1.e-4, 20)
+
+def sample_setup(regions):
+    user_inputs = ExperimentalSetup()
+    user_inputs.drop_region, user_inputs.needle_region = regions
+    user_inputs.residuals_boole = 0
+    user_inputs.profiles_boole = 0
+    user_inputs.interfacial_tension_boole = 0
+    user_inputs.drop_density = 1000.
+    user_inputs.continuous_density = 0.
+    user_inputs.needle_diameter_mm = 0.7176
+    return user_inputs
+
+# extracts the drop and needle profiles from image
+def extract_drop(image, user_inputs):
+    experimental_drop = ExperimentalDrop()
+    experimental_drop.image = image
+    extract_drop_profile(experimental_drop, user_inputs)
+    return experimental_drop
+
+# reads filename and extracts the drop and needle profiles
+def load_drop(filename, user_inputs):
+    return extract_drop(cv2.imread(filename, 1), user_inputs)
+
+# a slowly changing sequence made by shifting and stretching the first test
+# image by a fraction of a pixel per frame about the needle
+def drifting_images(n_frames):
+    filename, regions = test_images()[0]
+    image = cv2.imread(filename, 1)
+    frames = []
+    for i in range(n_frames):
+        scale = 1 + 0.002 * i
+        transform = np.float32([[1, 0, 0.3 * i], [0, scale, 0]])
+        frames.append((cv2.warpAffine(image, transform, (image.shape[1], image.shape[0]), borderMode=cv2.BORDER_REPLICATE), regions))
+    return frames
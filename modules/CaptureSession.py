@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+#coding=utf-8
+from __future__ import print_function
+import threading
+import time
+import timeit
+
+import cv2
+
+CAP_PROP_POS_MSEC = getattr(cv2, 'CAP_PROP_POS_MSEC', 0) # same property id in OpenCV 2
+CAMERA_PORT = 0
+RAMP_FRAMES = 40 # frames discarded while the camera adjusts its exposure
+FRAME_TIMEOUT = 5.0 # seconds to wait for a new frame before giving up
+
+# Keeps a camera open between frames. The device is opened and ramped once,
+# then a background thread keeps grabbing so that the exposure stays settled
+# and read() always returns a frame taken after it was called, rather than
+# one left in the driver's buffer. Frames are returned as arrays together
+# with their timestamp in seconds on one time base for the whole session:
+# the first frame is stamped with the time it was grabbed, and the later ones
+# with that time plus the backend's position since the first frame if the
+# position advanced at the second frame, otherwise with their grab times.
+class CaptureSession(object):
+    def __init__(self, capture=None, ramp_frames=RAMP_FRAMES, background=True):
+        if capture is None:
+            capture = cv2.VideoCapture(CAMERA_PORT)
+            if not capture.isOpened():
+                raise IOError("Could not open camera %d" % CAMERA_PORT)
+        elif not capture.isOpened():
+            raise IOError("Could not open the capture")
+        self.capture = capture
+        for i in range(ramp_frames):
+            self.capture.grab()
+        self.frame = None
+        self.timestamp = None
+        self.frame_count = 0 # frames grabbed since the session was opened
+        self.first_frame_time = None # [grab time, backend position] of the first frame
+        self.use_position = None # time base, chosen at the second frame
+        self.condition = threading.Condition()
+        self.thread = None
+        self.running = False
+        if background:
+            self.running = True
+            self.thread = threading.Thread(target=self.keep_grabbing)
+            self.thread.daemon = True
+            self.thread.start()
+
+    # returns [image, timestamp] of the next frame grabbed after the call
+    def read(self):
+        with self.condition:
+            next_frame = self.frame_count + 1
+        if self.thread is None:
+            self.grab_frame()
+        with self.condition:
+            deadline = timeit.default_timer() + FRAME_TIMEOUT
+            while (self.frame_count < next_frame) and self.running:
+                remaining = deadline - timeit.default_timer()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+            if self.frame_count < next_frame:
+                raise IOError("No new frame from the camera")
+            return [self.frame, self.timestamp]
+
+    def close(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.capture.release()
+
+    def keep_grabbing(self):
+        while self.running:
+            if not self.grab_frame():
+                with self.condition:
+                    self.running = False
+                    self.condition.notify_all()
+
+    # grabs and decodes one frame, returning False when the backend fails
+    def grab_frame(self):
+        if not self.capture.grab():
+            return False
+        grab_time = timeit.default_timer()
+        retval, image = self.capture.retrieve()
+        if not retval:
+            return False
+        position = self.capture.get(CAP_PROP_POS_MSEC) / 1000.
+        if self.first_frame_time is None:
+            self.first_frame_time = [grab_time, position]
+        elif self.use_position is None:
+            self.use_position = position > self.first_frame_time[1]
+        with self.condition:
+            self.frame = image
+            if self.use_position:
+                self.timestamp = self.first_frame_time[0] + position - self.first_frame_time[1]
+            else:
+                self.timestamp = grab_time
+            self.frame_count += 1
+            self.condition.notify_all()
+        return True
+
+# A stand-in for cv2.VideoCapture that replays image files, looping over
+# them, for running camera sessions without a camera. If fps is given, grab
+# waits for the frame interval and the position advances by it.
+class FileReplayCapture(object):
+    def __init__(self, filenames, fps=None, image_flag=1):
+        self.images = [cv2.imread(filename, image_flag) for filename in filenames]
+        self.fps = fps
+        self.index = -1
+        self.opened = len(self.images) > 0
+        self.last_grab_time = None
+
+    def isOpened(self):
+        return self.opened
+
+    def grab(self):
+        if not self.opened:
+            return False
+        if self.fps:
+            if self.last_grab_time is not None:
+                wait_time = self.last_grab_time + 1. / self.fps - timeit.default_timer()
+                if wait_time > 0:
+                    time.sleep(wait_time)
+            self.last_grab_time = timeit.default_timer()
+        self.index += 1
+        return True
+
+    def retrieve(self):
+        if (not self.opened) or (self.index < 0):
+            return False, None
+        return True, self.images[self.index % len(self.images)].copy()
+
+    def read(self):
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+
+    def get(self, property_id):
+        if (property_id == CAP_PROP_POS_MSEC) and self.fps:
+            return 1000. * self.index / self.fps
+        return 0
+
+    def release(self):
+        self.opened = False
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+#coding=utf-8
+from __future__ import print_function
+import fnmatch
+import os
+import threading
+import time
+import timeit
+
+import cv2
+
+from sources import NoMoreImages
+
+try:
+    import pyinotify # Linux only
+except ImportError:
+    pyinotify = None
+
+POLL_INTERVAL = 0.2 # seconds between directory scans
+SETTLE_TIME = 0.5 # seconds a polled file must keep its size before it is read
+READ_ATTEMPTS = 5 # decoding attempts, POLL_INTERVAL apart, before a file is skipped
+WATCH_ORDERS = ["name", "mtime"]
+
+# Returns the images written into a directory, as they are completed, in
+# order of name or modification time among the images waiting. With
+# pyinotify, an image is complete once the writer closes it (or moves it into
+# the directory); otherwise the directory is polled and an image is complete
+# once its size has not changed for settle_time. Images that cannot be
+# decoded yet are retried before being skipped. Timestamps are modification
+# times.
+class DirectoryWatcher(object):
+    def __init__(self, directory, pattern="*", order="name", include_existing=True, timeout=None, image_flag=1, poll_interval=POLL_INTERVAL, settle_time=SETTLE_TIME):
+        if order not in WATCH_ORDERS:
+            raise ValueError("Watch order must be one of " + ", ".join(WATCH_ORDERS))
+        if not os.path.isdir(directory):
+            raise IOError("No directory " + directory)
+        self.directory = directory
+        self.pattern = pattern
+        self.order = order
+        self.timeout = timeout # seconds to wait for a new image, None to wait for ever
+        self.image_flag = image_flag
+        self.poll_interval = poll_interval
+        self.settle_time = settle_time
+        self.number_of_frames = None # not known in advance
+        self.seen = set() # files queued or read
+        self.pending = {} # files not yet complete -> [(size, mtime), time they were first seen so]
+        self.ready = [] # complete files waiting to be read
+        self.next_frame = None
+        self.condition = threading.Condition()
+        self.stopped = threading.Event()
+        existing = self.matching_files()
+        if include_existing:
+            for filename in existing:
+                self.pending[filename] = None # may still be being written
+        else:
+            self.seen.update(existing)
+        self.notifier = None
+        if pyinotify is not None:
+            watch_manager = pyinotify.WatchManager()
+            self.notifier = pyinotify.Notifier(watch_manager, self.file_event, timeout=int(1000 * poll_interval))
+            watch_manager.add_watch(directory, pyinotify.IN_CLOSE_WRITE | pyinotify.IN_MOVED_TO)
+        self.thread = threading.Thread(target=self.watch)
+        self.thread.daemon = True
+        self.thread.start()
+
+    # returns [image, timestamp] of the next complete image
+    def read(self):
+        frame = self.peek()
+        self.next_frame = None
+        return frame
+
+    # returns [image, timestamp] of the next complete image without moving on
+    def peek(self):
+        while self.next_frame is None:
+            filename = self.next_file()
+            image = self.decode(filename)
+            if image is None:
+                print("WARNING: could not read %s, skipping it" % filename)
+                continue
+            self.next_frame = [image, os.path.getmtime(filename)]
+        return self.next_frame
+
+    def close(self):
+        self.stopped.set()
+        with self.condition:
+            self.condition.notify_all()
+        self.thread.join()
+        if self.notifier is not None:
+            self.notifier.stop()
+
+    # waits for the next complete file, in order among those waiting
+    def next_file(self):
+        start_time = timeit.default_timer()
+        with self.condition:
+            while len(self.ready) == 0:
+                if self.stopped.is_set():
+                    raise NoMoreImages()
+                waited = timeit.default_timer() - start_time
+                if (self.timeout is not None) and (waited >= self.timeout):
+                    raise NoMoreImages()
+                self.condition.wait(self.poll_interval)
+            filename = min(self.ready, key=self.sort_key)
+            self.ready.remove(filename)
+        return filename
+
+    def sort_key(self, filename):
+        if self.order == "mtime":
+            return [os.path.getmtime(filename), filename]
+        return filename
+
+    def decode(self, filename):
+        for attempt in range(READ_ATTEMPTS):
+            image = cv2.imread(filename, self.image_flag)
+            if image is not None:
+                return image
+            time.sleep(self.poll_interval) # e.g. rewritten since it was found complete
+        return None
+
+    def watch(self):
+        while not self.stopped.is_set():
+            if self.notifier is None:
+                time.sleep(self.poll_interval)
+                for filename in self.matching_files():
+                    if (filename not in self.seen) and (filename not in self.pending):
+                        self.pending[filename] = None
+            elif self.notifier.check_events():
+                self.notifier.read_events()
+                self.notifier.process_events()
+            self.settle_pending()
+
+    # queues the pending files whose size and modification time have not
+    # changed for settle_time
+    def settle_pending(self):
+        now = timeit.default_timer()
+        for filename in list(self.pending):
+            try:
+                stat = os.stat(filename)
+            except OSError:
+                del self.pending[filename] # removed again
+                continue
+            signature = (stat.st_size, stat.st_mtime)
+            if (self.pending[filename] is None) or (self.pending[filename][0] != signature):
+                self.pending[filename] = [signature, now]
+            elif (stat.st_size > 0) and (now - self.pending[filename][1] >= self.settle_time):
+                del self.pending[filename]
+                self.file_completed(filename)
+
+    # inotify event of a file closed after writing or moved into the directory
+    def file_event(self, event):
+        if (not event.dir) and fnmatch.fnmatch(event.name, self.pattern):
+            self.pending.pop(event.pathname, None)
+            if event.pathname not in self.seen:
+                self.file_completed(event.pathname)
+
+    def file_completed(self, filename):
+        with self.condition:
+            self.seen.add(filename)
+            self.ready.append(filename)
+            self.condition.notify_all()
+
+    def matching_files(self):
+        return [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                if fnmatch.fnmatch(name, self.pattern) and os.path.isfile(os.path.join(self.directory, name))]
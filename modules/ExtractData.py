@@ -1,17 +1,47 @@
 #!/usr/bin/env python
 # coding=utf-8
+import json
+import os
+import timeit
+
+from GrowableArray import GrowableArray, INITIAL_ROWS, CHUNK_ROWS, read_growable_array
+from ResultWriter import open_result_writer
+
 import numpy as np
 
+METADATA_FILENAME = "extracted_data.json"
+METADATA_FRAMES = 100 # frames added before the metadata is written again
+METADATA_TIME = 1. # seconds after the last metadata write
+SCALAR_COLUMNS = ["time", "gamma_IFT_mN", "pixels_to_mm", "volume", "area", "worthington", "missed_deadlines", "backlog"]
+
 class ExtractedData(object):
-    def __init__(self, n_frames, n_params):
+    # n_frames is only the initial allocation (None if unknown), the arrays
+    # growing as frames are added - with a directory, they are kept in
+    # memory-mapped files there, which another process can read with
+    # load_extracted_data while the run goes on
+    def __init__(self, n_frames, n_params, directory=None):
         self.initial_image_time = None
-        self.time = np.zeros(n_frames)
-        self.gamma_IFT_mN = np.zeros(n_frames)
-        self.pixels_to_mm = np.zeros(n_frames)
-        self.volume = np.zeros(n_frames)
-        self.area = np.zeros(n_frames)
-        self.worthington = np.zeros(n_frames)
-        self.parameters = np.zeros((n_frames, n_params))
+        self.directory = directory
+        if directory is not None and not os.path.isdir(directory):
+            os.makedirs(directory)
+        initial_rows = n_frames or INITIAL_ROWS
+        self.time = GrowableArray((), initial_rows, directory, "time")
+        self.gamma_IFT_mN = GrowableArray((), initial_rows, directory, "gamma_IFT_mN")
+        self.pixels_to_mm = GrowableArray((), initial_rows, directory, "pixels_to_mm")
+        self.volume = GrowableArray((), initial_rows, directory, "volume")
+        self.area = GrowableArray((), initial_rows, directory, "area")
+        self.worthington = GrowableArray((), initial_rows, directory, "worthington")
+        self.parameters = GrowableArray((n_params,), initial_rows, directory, "parameters")
+        self.missed_deadlines = GrowableArray((), initial_rows, directory, "missed_deadlines") # missed capture deadlines up to each frame
+        self.backlog = GrowableArray((), initial_rows, directory, "backlog") # frames waiting to be fitted after each frame
+        self.result_writer = None
+        self.result_filename = None
+        self.metadata_frames = 0 # frames recorded by the last metadata write
+        self.metadata_time = timeit.default_timer()
+
+    # number of frames stored
+    def n_frames(self):
+        return len(self.time)
 
     def time_IFT_vol_area(self, i):
         # build the time-IFT-volume-area array used in the plotting function
@@ -19,26 +49,60 @@ class ExtractedData(object):
    
     def output_data(self,i):
         # builds the output array
-        array = np.concatenate((np.array([self.time[i], self.gamma_IFT_mN[i], self.volume[i], self.area[i],self.worthington[i]]), self.parameters[i]))
+        array = np.concatenate((np.array([self.time[i], self.gamma_IFT_mN[i], self.volume[i], self.area[i],self.worthington[i]]), self.parameters[i], [self.missed_deadlines[i], self.backlog[i]]))
         array = array.reshape(1, array.shape[0])
         return array
 
-    def header_string(self,i):
-        if i==0:
-            return "Time (s),IFT (mN/m),Volume (uL),Area (mm2),Worthington number,x-apex (px),y-apex (px),Apex radius (px),Bond number,Rotation (degree)"
-        else:
-            return ''
+    def column_headings(self):
+        return ["Time (s)", "IFT (mN/m)", "Volume (uL)", "Area (mm2)", "Worthington number", "x-apex (px)", "y-apex (px)", "Apex radius (px)", "Bond number", "Rotation (degree)", "Missed deadlines", "Backlog (frames)"]
+
+    def record_schedule(self, i, missed_deadlines, backlog):
+        self.missed_deadlines[i] = missed_deadlines
+        self.backlog[i] = backlog
 
     def export_data(self, filename,i):
-        # header and comment not supported for version number < 1.7
-        # this is a hack routine to check this...
-        # also - this outputs variables into a csv file with 5 significant figures
-        try:
-            f = open(filename,'a')
-            np.savetxt(f, self.output_data(i), delimiter=',', fmt='%10.5f', header=self.header_string(i), comments='')
-            f.close()
-        except:
-            with open(filename, 'a') as f:
-                f.write(self.header_string(i)+'\n')
-                #np.savetxt(f, self.output_data(), delimiter=',', fmt='%10.5f')
-                np.savetxt(f, self.output_data(), fmt='%10.5f')
+        # the results file is kept open and written in batches (see
+        # ResultWriter), in the format given by the extension of filename
+        if (self.result_writer is None) or (self.result_filename != filename):
+            self.close_results()
+            self.result_writer = open_result_writer(filename, self.column_headings())
+            self.result_filename = filename
+        self.result_writer.write(self.output_data(i)[0])
+        # the metadata flushes every column, so it is written in batches -
+        # and whenever a chunk file is filled - rather than for every frame
+        n_frames = self.n_frames()
+        if ((n_frames - self.metadata_frames >= METADATA_FRAMES) or (n_frames // CHUNK_ROWS != self.metadata_frames // CHUNK_ROWS)
+                or (timeit.default_timer() - self.metadata_time >= METADATA_TIME)):
+            self.write_metadata()
+
+    def close_results(self):
+        # writes the rows still buffered and closes the results file
+        if self.result_writer is not None:
+            self.result_writer.close()
+            self.result_writer = None
+        self.write_metadata()
+
+    # records the number of frames in the directory, once their values are
+    # written to the memory-mapped files
+    def write_metadata(self):
+        self.metadata_frames = self.n_frames()
+        self.metadata_time = timeit.default_timer()
+        if self.directory is None:
+            return
+        for name in SCALAR_COLUMNS + ["parameters"]:
+            getattr(self, name).flush()
+        metadata_filename = os.path.join(self.directory, METADATA_FILENAME)
+        with open(metadata_filename + ".tmp", 'w') as metadata_file:
+            json.dump({"n_frames": self.n_frames(), "initial_image_time": self.initial_image_time}, metadata_file)
+        if (os.name == 'nt') and os.path.isfile(metadata_filename):
+            os.remove(metadata_filename) # rename does not replace files on Windows
+        os.rename(metadata_filename + ".tmp", metadata_filename) # readers never see a partial file
+
+# returns the frames stored so far by an ExtractedData kept in directory, as
+# a dictionary of arrays named after its attributes - during a run, up to
+# the last metadata write, at most METADATA_FRAMES frames or METADATA_TIME
+# seconds behind
+def load_extracted_data(directory):
+    with open(os.path.join(directory, METADATA_FILENAME)) as metadata_file:
+        n_frames = json.load(metadata_file)["n_frames"]
+    return dict((name, read_growable_array(directory, name, n_frames)) for name in SCALAR_COLUMNS + ["parameters"])
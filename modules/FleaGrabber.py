@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+#coding=utf-8
+from __future__ import print_function
+import os
+import subprocess
+import timeit
+
+import cv2
+import numpy as np
+
+# Talks to a long-running grabber process that keeps the camera initialised.
+# Each request line written to its stdin is answered with one binary PGM (P5)
+# image on its stdout. The grabber may put the capture time in seconds in a
+# "# time <seconds>" header comment; otherwise the time at which the frame
+# arrived is used. modules/stub_grabber.py implements the protocol by
+# replaying image files.
+class StreamingGrabber(object):
+    def __init__(self, command):
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    # returns [image, timestamp] of a newly grabbed frame
+    def read(self):
+        try:
+            self.process.stdin.write(b"grab\n")
+            self.process.stdin.flush()
+        except (IOError, OSError):
+            raise IOError("The grabber process has stopped")
+        return read_pgm(self.process.stdout)
+
+    def close(self):
+        try:
+            self.process.stdin.write(b"quit\n")
+            self.process.stdin.close()
+        except (IOError, OSError):
+            pass # already stopped
+        self.process.wait()
+
+# Runs the single-frame grabber FCGrab for each frame, which initialises the
+# camera every time - used when there is no streaming grabber.
+class PerFrameGrabber(object):
+    def __init__(self, command, filename='FCG.pgm'):
+        self.command = command
+        self.filename = filename # image written by the grabber
+
+    # returns [image, timestamp] of a newly grabbed frame
+    def read(self):
+        subprocess.call(self.command)
+        timestamp = timeit.default_timer()
+        image = cv2.imread(self.filename, cv2.IMREAD_UNCHANGED)
+        if image is None:
+            raise IOError("The grabber did not write " + self.filename)
+        os.remove(self.filename)
+        return [image, timestamp]
+
+    def close(self):
+        pass
+
+# reads one binary PGM image from the stream, returning [image, timestamp]
+def read_pgm(stream):
+    timestamp = None
+    fields = []
+    while len(fields) < 4: # magic number, width, height and maximum value
+        line = stream.readline()
+        if not line:
+            raise IOError("The grabber process has stopped")
+        line = line.decode('ascii')
+        if line.startswith('#'):
+            comment = line[1:].split()
+            if (len(comment) == 2) and (comment[0] == 'time'):
+                timestamp = float(comment[1])
+            continue
+        fields += line.split()
+    if fields[0] != 'P5':
+        raise IOError("The grabber did not send a binary PGM image")
+    width, height, max_value = [int(field) for field in fields[1:4]]
+    dtype = np.dtype('>u2') if max_value > 255 else np.dtype('u1') # 16-bit PGM is big endian
+    data = stream.read(width * height * dtype.itemsize)
+    if len(data) != width * height * dtype.itemsize:
+        raise IOError("The grabber process has stopped")
+    if timestamp is None:
+        timestamp = timeit.default_timer()
+    image = np.frombuffer(data, dtype).reshape(height, width)
+    return [image.astype(dtype.newbyteorder('=')), timestamp]
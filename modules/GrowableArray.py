@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+#coding=utf-8
+from collections import OrderedDict
+import glob
+import os
+import re
+import threading
+
+import numpy as np
+
+INITIAL_ROWS = 256 # rows allocated by an in-memory array before it grows
+CHUNK_ROWS = 4096 # rows per chunk file of a memory-mapped array
+OPEN_CHUNKS = 2 # chunk files kept mapped by a memory-mapped array
+
+# An array of rows indexed by frame number that grows as rows are written.
+# Rows are kept in memory, doubling the allocation when needed, or, if a
+# directory is given, in chunk files <directory>/<name>_00000.npy, ... of
+# CHUNK_ROWS rows each, of which only the most recently used are mapped. The
+# chunk files are ordinary .npy files, so another process can read the rows
+# written so far (see read_growable_array).
+class GrowableArray(object):
+    def __init__(self, row_shape=(), initial_rows=INITIAL_ROWS, directory=None, name=None):
+        self.row_shape = tuple(row_shape)
+        self.directory = directory
+        self.name = name
+        self.length = 0 # one more than the largest row index written
+        if directory is None:
+            self.data = np.zeros((max(1, initial_rows),) + self.row_shape)
+        else:
+            self.chunks = OrderedDict() # chunk number -> memory map, least recently used first
+            self.lock = threading.Lock() # rows are written and read from different pipeline stages
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, i):
+        i = self.row_index(i)
+        if i >= self.length:
+            return np.zeros(self.row_shape)[()] # rows not written yet read as zero
+        if self.directory is None:
+            return self.data[i]
+        return self.chunk(i // CHUNK_ROWS)[i % CHUNK_ROWS]
+
+    def __setitem__(self, i, value):
+        i = self.row_index(i)
+        if self.directory is None:
+            if i >= len(self.data):
+                self.grow(i + 1)
+            self.data[i] = value
+        else:
+            self.chunk(i // CHUNK_ROWS)[i % CHUNK_ROWS] = value
+        self.length = max(self.length, i + 1)
+
+    # all rows written so far, as one array
+    def values(self):
+        if self.directory is None:
+            return self.data[:self.length]
+        n_chunks = (self.length + CHUNK_ROWS - 1) // CHUNK_ROWS
+        if n_chunks == 0:
+            return np.zeros((0,) + self.row_shape)
+        return np.concatenate([self.chunk(n) for n in range(n_chunks)])[:self.length]
+
+    # writes the mapped chunks to their files
+    def flush(self):
+        if self.directory is not None:
+            with self.lock:
+                for chunk in self.chunks.values():
+                    chunk.flush()
+
+    def row_index(self, i):
+        i = int(i)
+        if i < 0:
+            i += self.length
+        if i < 0:
+            raise IndexError("Row index out of range")
+        return i
+
+    def grow(self, n_rows):
+        data = np.zeros((max(n_rows, 2 * len(self.data)),) + self.row_shape)
+        data[:len(self.data)] = self.data
+        self.data = data # a reader still holding the old array sees the rows written before
+
+    # the memory map of chunk n, creating its file if it does not exist
+    def chunk(self, n):
+        with self.lock:
+            if n in self.chunks:
+                chunk = self.chunks.pop(n)
+            else:
+                filename = chunk_filename(self.directory, self.name, n)
+                if os.path.isfile(filename):
+                    chunk = np.load(filename, mmap_mode='r+')
+                else:
+                    chunk = np.lib.format.open_memmap(filename, mode='w+', dtype=float, shape=(CHUNK_ROWS,) + self.row_shape)
+                while len(self.chunks) >= OPEN_CHUNKS:
+                    self.chunks.popitem(last=False)[1].flush()
+            self.chunks[n] = chunk
+            return chunk
+
+def chunk_filename(directory, name, n):
+    return os.path.join(directory, "%s_%05d.npy" % (name, n))
+
+# reads the first length rows of the memory-mapped array name in directory
+def read_growable_array(directory, name, length):
+    filenames = sorted(filename for filename in glob.glob(os.path.join(directory, name + "_*.npy"))
+                       if re.match(r'^_\d{5}\.npy$', os.path.basename(filename)[len(name):]))
+    if len(filenames) == 0:
+        return np.zeros(0)
+    return np.concatenate([np.load(filename, mmap_mode='r') for filename in filenames])[:length]
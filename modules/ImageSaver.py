@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+#coding=utf-8
+from __future__ import print_function
+try:
+    # for Python2
+    import Queue as queue
+except ImportError:
+    # for Python3
+    import queue
+import os
+import threading
+import zipfile
+
+import cv2
+import numpy as np
+
+QUEUE_SIZE = 16 # images waiting to be written before save blocks the caller
+
+# Writes images from a background thread. Images can be cropped to a region
+# and converted to grayscale before they are queued, and are either written
+# as individual files or appended, encoded in the format of their file
+# extension, to a single zip archive.
+class ImageSaver(object):
+    def __init__(self, region=None, grayscale=False, archive_filename=None, queue_size=QUEUE_SIZE):
+        self.region = region # [(min_x, min_y), (max_x, max_y)] to keep, or None for the whole image
+        self.grayscale = grayscale
+        self.archive = None
+        if archive_filename is not None:
+            self.archive = zipfile.ZipFile(archive_filename, 'a', zipfile.ZIP_STORED, allowZip64=True) # images are compressed already
+        self.images = queue.Queue(queue_size)
+        self.error = None
+        self.thread = threading.Thread(target=self.write_images)
+        self.thread.daemon = True
+        self.thread.start()
+
+    # queues image to be written as filename (or as its name in the archive)
+    def save(self, image, filename):
+        if self.error is not None:
+            raise self.error
+        if self.region is not None:
+            image = image[max(0, int(self.region[0][1])):int(self.region[1][1]), max(0, int(self.region[0][0])):int(self.region[1][0])]
+        if self.grayscale and (len(image.shape) == 3):
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        if self.region is not None:
+            image = np.array(image, copy=True) # a crop is a view, which would keep the whole frame queued
+        self.images.put([image, filename])
+
+    # writes the queued images and stops the writer
+    def close(self):
+        self.images.put(None)
+        self.thread.join()
+        if self.archive is not None:
+            self.archive.close()
+        if self.error is not None:
+            raise self.error
+
+    def write_images(self):
+        while True:
+            entry = self.images.get()
+            if entry is None:
+                return
+            if self.error is not None:
+                continue # keep emptying the queue so that save does not block
+            image, filename = entry
+            try:
+                if self.archive is None:
+                    if not cv2.imwrite(filename, image):
+                        raise IOError("Could not write " + filename)
+                else:
+                    retval, encoded = cv2.imencode(os.path.splitext(filename)[1], image)
+                    self.archive.writestr(os.path.basename(filename), encoded.tobytes())
+            except Exception as exception:
+                print("Could not save image %s: %s" % (filename, exception))
+                self.error = exception
+
+# [(min_x, min_y), (max_x, max_y)] of the smallest region containing both
+# regions
+def region_union(region_a, region_b):
+    return [(min(region_a[0][0], region_b[0][0]), min(region_a[0][1], region_b[0][1])),
+            (max(region_a[1][0], region_b[1][0]), max(region_a[1][1], region_b[1][1]))]
@@ -8,38 +8,57 @@ import numpy as np
 # VOL_MAX = 10.
 # AREA_MAX = 10.
 PAD = 0.1
+PLOT_HISTORY = 1000 # most recent points plotted, so that long runs keep plotting quickly
+INITIAL_POINTS = 64
 
 class PlotManager(object):
-    def __init__(self, wait_time, n_frames):
-        self.max_time = wait_time * n_frames
-        self.time_values = np.zeros(n_frames)
-        self.IFT_values = np.zeros(n_frames)
-        self.volume_values = np.zeros(n_frames)
-        self.area_values = np.zeros(n_frames)
+    # n_frames may be None for a run without a set number of frames
+    def __init__(self, wait_time, n_frames, history=PLOT_HISTORY):
+        self.max_time = wait_time * (n_frames or 1)
+        self.history = history
+        # [time, IFT, volume, area] of the plotted points, in columns
+        # start:end of a buffer that grows up to twice the history, after
+        # which the most recent points are moved back to its front
+        self.values = np.zeros((4, min(n_frames or INITIAL_POINTS, history)))
+        self.start = 0
+        self.end = 0
         self.plots_initialised = False
         self.axes_update = None
         self.IFT_axis_max = 0
         self.volume_axis_max = 0
         self.area_axis_max = 0
 
-    def append_data_time(self, data_value, position):
-        self.time_values[position:] = data_value
-        # self.check_max_time(data_value)
+    @property
+    def time_values(self):
+        return self.values[0, self.start:self.end]
 
-    def append_data_IFT(self, data_value, position):
-        self.IFT_values[position:] = data_value
+    @property
+    def IFT_values(self):
+        return self.values[1, self.start:self.end]
 
-    def append_data_volume(self, data_value, position):
-        self.volume_values[position:] = data_value
+    @property
+    def volume_values(self):
+        return self.values[2, self.start:self.end]
 
-    def append_data_area(self, data_value, position):
-        self.area_values[position:] = data_value
+    @property
+    def area_values(self):
+        return self.values[3, self.start:self.end]
 
+    # adds the [time, IFT, volume, area] of frame position - the frames are
+    # plotted in the order they are added
     def append_data(self, data_vector, position):
-        self.append_data_time(data_vector[0], position)
-        self.append_data_IFT(data_vector[1], position)
-        self.append_data_volume(data_vector[2], position)
-        self.append_data_area(data_vector[3], position)
+        if self.end == self.values.shape[1]:
+            if self.values.shape[1] < 2 * self.history:
+                values = np.zeros((4, min(2 * self.values.shape[1], 2 * self.history)))
+                values[:, :self.end] = self.values[:, :self.end]
+                self.values = values
+            else:
+                self.values[:, :self.history - 1] = self.values[:, self.end - self.history + 1:self.end]
+                self.end = self.history - 1
+        self.values[:, self.end] = data_vector[:4]
+        self.end += 1
+        self.start = max(0, self.end - self.history)
+        self.check_time_axis(data_vector[0])
 
     def append_data_plot(self, data_vector, position):
         self.append_data(data_vector, position)
@@ -78,12 +97,10 @@ class PlotManager(object):
         if self.plots_initialised == False:
             self.initialise_plot()
             self.plots_initialised = True
-        self.IFT_line.set_xdata(self.time_values)
-        self.IFT_line.set_ydata(self.IFT_values)
-        self.volume_line.set_xdata(self.time_values)
-        self.volume_line.set_ydata(self.volume_values)
-        self.area_line.set_xdata(self.time_values)
-        self.area_line.set_ydata(self.area_values)
+        # x and y together, as the number of points changes
+        self.IFT_line.set_data(self.time_values, self.IFT_values)
+        self.volume_line.set_data(self.time_values, self.volume_values)
+        self.area_line.set_data(self.time_values, self.area_values)
         if self.axes_update:
             self.update_plot_axes()
         self.fig.canvas.draw()
@@ -135,15 +152,16 @@ class PlotManager(object):
         # self.IFT_plot.axis((0,self.max_time,0,self.IFT_axis_max))
         # self.volume_plot.axis((0,self.max_time,0,self.volume_axis_max))
         # self.area_plot.axis((0,self.max_time,0,self.area_axis_max))
-	IFTmin,IFTmax =0.98 * min(self.IFT_values), 1.02 * max(self.IFT_values)
-	volmin,volmax =0.98 * min(self.volume_values), 1.02 * max(self.volume_values)
-	surmin,surmax =0.98 * min(self.area_values), 1.02 * max(self.area_values)
-        self.IFT_plot.axes.set_xlim([0,self.max_time])
-	self.IFT_plot.axes.set_ylim([IFTmin,IFTmax])
-	self.volume_plot.axes.set_xlim([0,self.max_time])
-	self.volume_plot.axes.set_ylim([volmin,volmax])
-	self.area_plot.axes.set_xlim([0,self.max_time])
-	self.area_plot.axes.set_ylim([surmin,surmax])	
+        IFTmin,IFTmax =0.98 * min(self.IFT_values), 1.02 * max(self.IFT_values)
+        volmin,volmax =0.98 * min(self.volume_values), 1.02 * max(self.volume_values)
+        surmin,surmax =0.98 * min(self.area_values), 1.02 * max(self.area_values)
+        min_time = self.time_values[0] # the start of the plotted history
+        self.IFT_plot.axes.set_xlim([min_time,self.max_time])
+        self.IFT_plot.axes.set_ylim([IFTmin,IFTmax])
+        self.volume_plot.axes.set_xlim([min_time,self.max_time])
+        self.volume_plot.axes.set_ylim([volmin,volmax])
+        self.area_plot.axes.set_xlim([min_time,self.max_time])
+        self.area_plot.axes.set_ylim([surmin,surmax])
         self.axes_update = False
 
     # def plot_profiles(self):
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+#coding=utf-8
+# Writers keeping the results file open and writing rows in batches, once
+# FLUSH_ROWS rows are waiting or FLUSH_TIME seconds after the last write.
+# The format follows the file extension:
+#   .csv            text, one row per frame
+#   .npz            columns in numbered chunk files <name>_00000.npz, ...
+#                   (read back with read_npz_results)
+#   .sqlite or .db  a "results" table indexed on time
+from __future__ import print_function
+import glob
+import os
+import re
+import sqlite3
+import timeit
+
+import numpy as np
+
+FLUSH_ROWS = 100
+FLUSH_TIME = 5. # seconds
+CSV_FORMAT = '%10.5f'
+SQLITE_EXTENSIONS = ['.sqlite', '.db']
+
+class ResultWriter(object):
+    def __init__(self, columns, flush_rows=FLUSH_ROWS, flush_time=FLUSH_TIME):
+        self.columns = columns
+        self.flush_rows = flush_rows
+        self.flush_time = flush_time
+        self.rows = []
+        self.last_flush_time = timeit.default_timer()
+
+    # adds a row of values, one per column
+    def write(self, row):
+        self.rows.append(row)
+        if (len(self.rows) >= self.flush_rows) or (timeit.default_timer() - self.last_flush_time >= self.flush_time):
+            self.flush()
+
+    def flush(self):
+        if len(self.rows) > 0:
+            self.write_rows(np.array(self.rows, dtype=float))
+            self.rows = []
+        self.last_flush_time = timeit.default_timer()
+
+    def close(self):
+        self.flush()
+
+class CSVResultWriter(ResultWriter):
+    def __init__(self, filename, columns, flush_rows=FLUSH_ROWS, flush_time=FLUSH_TIME):
+        ResultWriter.__init__(self, columns, flush_rows, flush_time)
+        write_header = (not os.path.isfile(filename)) or (os.path.getsize(filename) == 0)
+        self.file = open(filename, 'a')
+        if write_header:
+            self.file.write(",".join(columns) + "\n")
+
+    def write_rows(self, rows):
+        self.file.write("".join(",".join(CSV_FORMAT % value for value in row) + "\n" for row in rows))
+        self.file.flush()
+
+    def close(self):
+        ResultWriter.close(self)
+        self.file.close()
+
+class NpzResultWriter(ResultWriter):
+    def __init__(self, filename, columns, flush_rows=FLUSH_ROWS, flush_time=FLUSH_TIME):
+        ResultWriter.__init__(self, columns, flush_rows, flush_time)
+        self.filename = filename
+        self.names = [column_name(column) for column in columns]
+        self.n_chunks = len(npz_chunk_filenames(filename)) # continues after earlier runs
+
+    def write_rows(self, rows):
+        np.savez(npz_chunk_filename(self.filename, self.n_chunks), **dict(zip(self.names, rows.T)))
+        self.n_chunks += 1
+
+class SQLiteResultWriter(ResultWriter):
+    def __init__(self, filename, columns, flush_rows=FLUSH_ROWS, flush_time=FLUSH_TIME):
+        ResultWriter.__init__(self, columns, flush_rows, flush_time)
+        self.names = [column_name(column) for column in columns]
+        self.connection = sqlite3.connect(filename)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS results (%s)" % ", ".join(name + " REAL" for name in self.names))
+        self.connection.execute("CREATE INDEX IF NOT EXISTS results_%s ON results (%s)" % (self.names[0], self.names[0]))
+        self.connection.commit()
+        self.insert = "INSERT INTO results (%s) VALUES (%s)" % (", ".join(self.names), ", ".join("?" * len(self.names)))
+
+    def write_rows(self, rows):
+        self.connection.executemany(self.insert, rows.tolist())
+        self.connection.commit()
+
+    def close(self):
+        ResultWriter.close(self)
+        self.connection.close()
+
+# opens the writer for the format given by the extension of filename
+def open_result_writer(filename, columns):
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.npz':
+        return NpzResultWriter(filename, columns)
+    if extension in SQLITE_EXTENSIONS:
+        return SQLiteResultWriter(filename, columns)
+    return CSVResultWriter(filename, columns)
+
+# returns the columns of the results written to filename.npz in chunks, as a
+# dictionary of arrays
+def read_npz_results(filename):
+    chunks = [np.load(chunk_filename) for chunk_filename in npz_chunk_filenames(filename)]
+    if len(chunks) == 0:
+        return {}
+    return dict((name, np.concatenate([chunk[name] for chunk in chunks])) for name in chunks[0].files)
+
+def npz_chunk_filename(filename, i):
+    return os.path.splitext(filename)[0] + '_%05d.npz' % i
+
+def npz_chunk_filenames(filename):
+    base = os.path.splitext(filename)[0]
+    return sorted(chunk for chunk in glob.glob(base + '_*.npz') if re.match(r'^_\d{5}\.npz$', chunk[len(base):]))
+
+# identifier for a column heading, e.g. "IFT (mN/m)" -> "ift_mn_m"
+def column_name(column):
+    return re.sub(r'[^0-9a-z]+', '_', column.lower()).strip('_')
@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+#coding=utf-8
+from __future__ import print_function
+try:
+    # for Python2
+    import Queue as queue
+except ImportError:
+    # for Python3
+    import queue
+import math
+import os
+import re
+import threading
+
+import cv2
+
+from sources import NoMoreImages
+
+CAP_PROP_POS_MSEC = getattr(cv2, 'CAP_PROP_POS_MSEC', 0) # property ids as in OpenCV 2
+CAP_PROP_FPS = getattr(cv2, 'CAP_PROP_FPS', 5)
+CAP_PROP_FRAME_COUNT = getattr(cv2, 'CAP_PROP_FRAME_COUNT', 7)
+QUEUE_SIZE = 8 # decoded frames waiting to be analysed
+SEQUENCE_FPS = 1. # frame rate assumed for numbered images when none is given
+IMAGE_EXTENSIONS = ['.png', '.tif', '.tiff', '.bmp', '.jpg', '.jpeg', '.pgm']
+QUEUE_POLL_TIME = 0.5 # seconds between checks for the session being closed
+
+# Streams frames from a video file, or from numbered images given by a
+# printf-style pattern such as "drop_%05d.png", decoding them in a background
+# thread into a bounded queue. Every stride-th frame between start_time and
+# end_time (in seconds from the first frame) is returned. Timestamps are the
+# container's presentation times for videos and frame number / fps for
+# numbered images.
+class VideoSource(object):
+    def __init__(self, filename, stride=1, start_time=None, end_time=None, fps=None, image_flag=1, queue_size=QUEUE_SIZE):
+        if '%' in filename:
+            self.reader = SequenceReader(filename, fps, image_flag)
+        else:
+            self.reader = VideoReader(filename, image_flag)
+        self.filename = filename
+        self.stride = stride
+        self.start_time = start_time
+        self.end_time = end_time
+        self.number_of_frames = self.count_frames()
+        self.frames = queue.Queue(queue_size)
+        self.next_frame = None
+        self.error = None # raised by the decoding thread, re-raised to the reader
+        self.running = True
+        self.thread = threading.Thread(target=self.decode_frames)
+        self.thread.daemon = True
+        self.thread.start()
+
+    # returns [image, timestamp] of the next selected frame
+    def read(self):
+        frame = self.peek()
+        self.next_frame = None
+        return frame
+
+    # returns [image, timestamp] of the next selected frame without moving on
+    def peek(self):
+        while self.next_frame is None:
+            try:
+                self.next_frame = self.frames.get(timeout=QUEUE_POLL_TIME)
+            except queue.Empty:
+                if not self.thread.is_alive():
+                    try:
+                        self.next_frame = self.frames.get_nowait() # put just before the thread ended
+                    except queue.Empty:
+                        self.next_frame = [] # the thread ended without the end of the stream
+        if len(self.next_frame) == 0: # end of the stream
+            if self.error is not None:
+                raise self.error
+            raise NoMoreImages() # the frame count is only an estimate
+        return self.next_frame
+
+    def close(self):
+        self.running = False
+        while self.thread.is_alive():
+            try:
+                self.frames.get_nowait() # unblock the decoding thread
+            except queue.Empty:
+                pass
+            self.thread.join(QUEUE_POLL_TIME)
+        self.reader.release()
+
+    # number of frames that will be returned, from the frame count and rate
+    def count_frames(self):
+        fps, frame_count = self.reader.fps, self.reader.frame_count
+        first = 0 if self.start_time is None else int(math.ceil(self.start_time * fps - 1.e-6))
+        last = frame_count - 1 if self.end_time is None else min(frame_count - 1, int(math.floor(self.end_time * fps + 1.e-6)))
+        return len(range(first, last + 1, self.stride))
+
+    # runs in the background, skipping unselected frames without decoding them
+    # - the end of the stream is always marked, after a failure too
+    def decode_frames(self):
+        n_in_range = 0
+        try:
+            while self.running:
+                timestamp = self.reader.grab()
+                if timestamp is None:
+                    break
+                if (self.start_time is not None) and (timestamp < self.start_time - 1.e-6):
+                    continue
+                if (self.end_time is not None) and (timestamp > self.end_time + 1.e-6):
+                    break
+                n_in_range += 1
+                if (n_in_range - 1) % self.stride != 0:
+                    continue
+                self.put([self.reader.retrieve(), timestamp])
+        except Exception as error:
+            self.error = error
+        finally:
+            self.put([])
+
+    def put(self, frame):
+        while self.running:
+            try:
+                self.frames.put(frame, timeout=QUEUE_POLL_TIME)
+                return
+            except queue.Full:
+                continue
+
+# reads a video file through cv2.VideoCapture
+class VideoReader(object):
+    def __init__(self, filename, image_flag):
+        self.capture = cv2.VideoCapture(filename)
+        if not self.capture.isOpened():
+            raise IOError("Could not open video " + filename)
+        self.filename = filename
+        self.image_flag = image_flag
+        self.fps = self.capture.get(CAP_PROP_FPS)
+        self.frame_count = int(self.capture.get(CAP_PROP_FRAME_COUNT))
+        self.first_position = None
+
+    # moves to the next frame and returns its timestamp, or None at the end -
+    # backends differ in whether the position is that of the grabbed or of
+    # the following frame, so times are measured from the first frame
+    def grab(self):
+        if not self.capture.grab():
+            return None
+        position = self.capture.get(CAP_PROP_POS_MSEC) / 1000.
+        if self.first_position is None:
+            self.first_position = position
+        return position - self.first_position
+
+    def retrieve(self):
+        retval, image = self.capture.retrieve()
+        if (not retval) or (image is None):
+            raise IOError("Could not decode a frame of " + self.filename)
+        if (self.image_flag == 0) and (len(image.shape) == 3):
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        return image
+
+    def release(self):
+        self.capture.release()
+
+# reads consecutive numbered images, starting from number 0 or 1
+class SequenceReader(object):
+    def __init__(self, pattern, fps, image_flag):
+        first = 0 if os.path.isfile(pattern % 0) else 1
+        self.filenames = []
+        while os.path.isfile(pattern % (first + len(self.filenames))):
+            self.filenames.append(pattern % (first + len(self.filenames)))
+        if len(self.filenames) == 0:
+            raise IOError("No images match " + pattern)
+        self.image_flag = image_flag
+        self.fps = fps or SEQUENCE_FPS
+        self.frame_count = len(self.filenames)
+        self.index = -1
+
+    def grab(self):
+        if self.index + 1 >= self.frame_count:
+            return None
+        self.index += 1
+        return self.index / self.fps
+
+    def retrieve(self):
+        image = cv2.imread(self.filenames[self.index], self.image_flag)
+        if image is None:
+            raise IOError("Could not read " + self.filenames[self.index])
+        return image
+
+    def release(self):
+        pass
+
+# returns the printf-style pattern of the numbered image sequence containing
+# filename (e.g. drop_00012.png -> drop_%05d.png), or filename itself if it is
+# not a numbered image
+def sequence_pattern(filename):
+    directory, name = os.path.split(filename)
+    match = re.match(r'^(.*?)(\d+)(\.\w+)$', name)
+    if (match is None) or (match.group(3).lower() not in IMAGE_EXTENSIONS):
+        return filename
+    prefix, number, extension = match.groups()
+    return os.path.join(directory, prefix.replace('%', '%%') + '%0' + str(len(number)) + 'd' + extension)
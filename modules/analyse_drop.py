@@ -0,0 +1,31 @@
+#!/usr/bin/env python
+#coding=utf-8
+from __future__ import print_function
+from extract_profile import extract_drop_profile
+from initialise_parameters import initialise_parameters
+from analyse_needle import calculate_needle_diameter
+from fit_data import fit_experimental_drop
+
+# extracts the drop and needle profiles from the image of raw_experiment and
+# fits the drop profile, starting from the previous frame's solution if a
+# WarmStart is given
+def analyse_drop(raw_experiment, fitted_drop_data, user_inputs, tolerances, warm_start=None):
+    extract_drop_profile(raw_experiment, user_inputs)
+    fit_drop(raw_experiment, fitted_drop_data, user_inputs, tolerances, warm_start)
+
+# fits the drop profile already extracted from the image of raw_experiment
+def fit_drop(raw_experiment, fitted_drop_data, user_inputs, tolerances, warm_start=None):
+    if warm_start is None:
+        initialise_parameters(raw_experiment, fitted_drop_data)
+        warm_started = False
+    else:
+        warm_started = warm_start.initialise_parameters(raw_experiment, fitted_drop_data, tolerances)
+    calculate_needle_diameter(raw_experiment, fitted_drop_data, tolerances)
+    fit_experimental_drop(raw_experiment, fitted_drop_data, user_inputs, tolerances)
+    print("Fitted in %d steps (warm start %s)" % (fitted_drop_data.fitting_steps, "on" if warm_started else "off"))
+    if len(fitted_drop_data.fitting_levels) > 1:
+        print("Steps per resolution: " + ", ".join("%d points: %d" % (n_points, steps) for n_points, steps in fitted_drop_data.fitting_levels))
+    print("Condition number of the normal matrix: %.1e" % fitted_drop_data.condition_number)
+    print("Newton iterations per point at each step: " + " ".join("%.1f" % iterations for iterations in fitted_drop_data.newton_iterations_per_step))
+    if warm_start is not None:
+        warm_start.update(fitted_drop_data)
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+#coding=utf-8
+# Reads the configuration file of a headless batch run (see opendrop_batch.cfg)
+try:
+    # for Python2
+    import ConfigParser as configparser
+except ImportError:
+    # for Python3
+    import configparser
+import glob
+import os
+
+from classes import ExperimentalSetup, Tolerances
+from warm_start import WarmStart
+from read_image import open_video_source
+
+# options used when the configuration file does not set them
+DEFAULT_OPTIONS = {
+    'delta_tol': '1.e-6',
+    'gradient_tol': '1.e-6',
+    'maximum_fitting_steps': '10',
+    'objective_tol': '1.e-4',
+    'arclength_tol': '1.e-6',
+    'maximum_arclength_steps': '10',
+    'needle_tol': '1.e-4',
+    'needle_steps': '20',
+    'multiresolution_points': '',
+    'multiresolution_tol': '1.e-3',
+    'projection': 'newton',
+    'solver': 'lmf',
+    'warm_start': 'yes',
+    'warm_start_extrapolate': 'no',
+    'stride': '1',
+    'start_time': '',
+    'end_time': '',
+    'fps': '',
+    'watch_pattern': '*.png',
+    'watch_order': 'name',
+    'watch_existing': 'yes',
+    'watch_timeout': '',
+    'save_images': 'no',
+    'save_roi_only': 'no',
+    'save_grayscale': 'no',
+    'save_archive': 'no',
+    'workers': '1',
+    'chunk_size': '10',
+}
+
+# returns [user_inputs, tolerances, warm_start] for the batch configuration
+# file filename - warm_start is None if warm starting is disabled
+def read_batch_config(filename):
+    config = configparser.RawConfigParser(DEFAULT_OPTIONS)
+    if not config.read(filename):
+        raise ValueError("Could not read configuration file " + filename)
+    for section in ['fitting', 'parallel']:
+        if not config.has_section(section):
+            config.add_section(section) # use the default options
+    config_directory = os.path.dirname(os.path.abspath(filename))
+
+    user_inputs = ExperimentalSetup()
+    user_inputs.drop_density = config.getfloat('physical', 'drop_density')
+    user_inputs.continuous_density = config.getfloat('physical', 'continuous_density')
+    user_inputs.needle_diameter_mm = config.getfloat('physical', 'needle_diameter_mm')
+    user_inputs.drop_region = read_region(config, 'drop_region')
+    user_inputs.needle_region = read_region(config, 'needle_region')
+
+    if config.has_option('input', 'watch'):
+        user_inputs.image_source = "Watched directory"
+        user_inputs.watch_directory = os.path.join(config_directory, config.get('input', 'watch'))
+        user_inputs.watch_pattern = config.get('input', 'watch_pattern')
+        user_inputs.watch_order = config.get('input', 'watch_order')
+        user_inputs.watch_existing = config.getboolean('input', 'watch_existing')
+        user_inputs.watch_timeout = read_optional_float(config, 'input', 'watch_timeout')
+        user_inputs.number_of_frames = None
+    elif config.has_option('input', 'video'):
+        user_inputs.image_source = "Video file"
+        user_inputs.video_filename = os.path.join(config_directory, config.get('input', 'video'))
+        user_inputs.video_stride = config.getint('input', 'stride')
+        user_inputs.video_start_time = read_optional_float(config, 'input', 'start_time')
+        user_inputs.video_end_time = read_optional_float(config, 'input', 'end_time')
+        user_inputs.video_fps = read_optional_float(config, 'input', 'fps')
+        open_video_source(user_inputs)
+        if user_inputs.number_of_frames == 0:
+            raise ValueError("No frames selected from " + user_inputs.video_filename)
+    else:
+        image_pattern = os.path.join(config_directory, config.get('input', 'images'))
+        user_inputs.image_source = "Local images"
+        user_inputs.import_files = sorted(glob.glob(image_pattern))
+        user_inputs.number_of_frames = len(user_inputs.import_files)
+        if user_inputs.number_of_frames == 0:
+            raise ValueError("No images match " + image_pattern)
+
+    user_inputs.output_filename = os.path.join(config_directory, config.get('output', 'filename'))
+    user_inputs.directory_string, output_name = os.path.split(user_inputs.output_filename)
+    user_inputs.filename = os.path.splitext(output_name)[0] + '.png' # base name of saved images
+    user_inputs.residuals_boole = 0
+    user_inputs.profiles_boole = 0
+    user_inputs.interfacial_tension_boole = 0
+    user_inputs.save_images_boole = config.getboolean('output', 'save_images')
+    user_inputs.save_roi_only = config.getboolean('output', 'save_roi_only')
+    user_inputs.save_grayscale = config.getboolean('output', 'save_grayscale')
+    user_inputs.save_archive = config.getboolean('output', 'save_archive')
+    if config.has_option('output', 'data_directory') and config.get('output', 'data_directory').strip():
+        user_inputs.data_directory = os.path.join(config_directory, config.get('output', 'data_directory').strip())
+    user_inputs.create_folder_boole = 0
+    user_inputs.wait_time = 0
+    user_inputs.number_of_workers = config.getint('parallel', 'workers')
+    user_inputs.chunk_size = config.getint('parallel', 'chunk_size')
+
+    tolerances = Tolerances(
+        config.getfloat('fitting', 'delta_tol'),
+        config.getfloat('fitting', 'gradient_tol'),
+        config.getint('fitting', 'maximum_fitting_steps'),
+        config.getfloat('fitting', 'objective_tol'),
+        config.getfloat('fitting', 'arclength_tol'),
+        config.getint('fitting', 'maximum_arclength_steps'),
+        config.getfloat('fitting', 'needle_tol'),
+        config.getint('fitting', 'needle_steps'),
+        [int(value) for value in config.get('fitting', 'multiresolution_points').split(',') if value.strip()],
+        config.getfloat('fitting', 'multiresolution_tol'),
+        config.get('fitting', 'projection'),
+        config.get('fitting', 'solver'))
+
+    warm_start = None
+    if config.getboolean('fitting', 'warm_start'):
+        warm_start = WarmStart(config.getboolean('fitting', 'warm_start_extrapolate'))
+    return [user_inputs, tolerances, warm_start]
+
+# reads an option that may be left empty, returning None if it is
+def read_optional_float(config, section, option):
+    value = config.get(section, option).strip()
+    if value == '':
+        return None
+    return float(value)
+
+# reads a region given as "min_x, min_y, max_x, max_y" in image pixels
+def read_region(config, option):
+    values = [float(value) for value in config.get('regions', option).split(',')]
+    if len(values) != 4:
+        raise ValueError(option + " must be given as min_x, min_y, max_x, max_y")
+    return [(values[0], values[1]), (values[2], values[3])]
@@ -2,13 +2,16 @@
 # coding=utf-8
 from de_YoungLaplace import ylderiv
 from de_YoungLaplace import dataderiv
-from interpolation_function import cubic_interpolation_function
+from interpolation_function import cubic_interpolation_coefficients
 from scipy.integrate import odeint
+from collections import OrderedDict
 
 import numpy as np
 
+PROFILE_CACHE_SIZE = 32 # number of generated profiles kept by each DropData
+
 class Tolerances(object):
-    def __init__(self, delta_tol, gradient_tol, maximum_fitting_steps, objective_tol, arclength_tol, maximum_arclength_steps, needle_tol, needle_steps):
+    def __init__(self, delta_tol, gradient_tol, maximum_fitting_steps, objective_tol, arclength_tol, maximum_arclength_steps, needle_tol, needle_steps, multiresolution_points=(), multiresolution_tol=1.e-3, projection="newton", solver="lmf"):
         self.DELTA_TOL = delta_tol
         self.GRADIENT_TOL = gradient_tol
         self.MAXIMUM_FITTING_STEPS = maximum_fitting_steps
@@ -17,6 +20,10 @@ class Tolerances(object):
         self.MAXIMUM_ARCLENGTH_STEPS = maximum_arclength_steps
         self.NEEDLE_TOL = needle_tol
         self.NEEDLE_STEPS = needle_steps
+        self.MULTIRESOLUTION_POINTS = list(multiresolution_points) # points at each coarse level of the fit
+        self.MULTIRESOLUTION_TOL = multiresolution_tol
+        self.PROJECTION = projection # closest-point search, "newton" or "kdtree" (see jacobian.PROJECTIONS)
+        self.SOLVER = solver # least-squares solver, see solvers.SOLVERS
 
 
 # class ExperimentalSetup(object):
@@ -49,10 +56,30 @@ class ExperimentalSetup(object):
         self.filename = None
         self.time_string = None
         self.local_files = None
+        self.capture_session = None # open CaptureSession, StreamingGrabber or VideoSource
+        self.grabber_command = None # command line of the Flea3 streaming grabber, None for ./FCGrabStream
+        self.video_filename = None # video file or numbered image pattern, e.g. drop_%05d.png
+        self.video_stride = 1 # analyse every video_stride-th frame
+        self.video_start_time = None # time range of the video to analyse, in seconds
+        self.video_end_time = None
+        self.video_fps = None # frame rate of numbered images
+        self.watch_directory = None # directory where another program writes the images
+        self.watch_pattern = "*.png"
+        self.watch_order = "name" # order of images waiting to be read, "name" or "mtime"
+        self.watch_existing = False # also analyse the images already in the directory
+        self.watch_timeout = None # seconds without a new image before stopping, None to wait for ever
+        self.image_saver = None # ImageSaver writing the saved images
+        self.save_roi_only = False # save the union of the drop and needle regions only
+        self.save_grayscale = False
+        self.save_archive = False # save into one zip archive instead of separate files
+        self.data_directory = None # directory of the memory-mapped fitted values, None to keep them in memory
+        self.preview_reduction = 1 # decode the image for selecting the regions at 1/2, 1/4 or 1/8 size (local images)
 
 class ExperimentalDrop(object):
     def __init__(self):
         self.image = None
+        self.image_reduction = 1 # image decoded at 1/image_reduction of the full size
+        self.image_height = None # of the full frame, kept once the image is released
         self.drop_region = None
         self.needle_region = None
         self.drop_data = None
@@ -72,10 +99,26 @@ class DropData(object):
         self._params = None
         self._max_s = None
         self._s_points = 200
-        self.theoretical_data = None
+        self._theoretical_data = None
+        self._hermite_coefficients = None
+        self._profile_outdated = True
+        self.profile_library = None
+        self.profile_cache = OrderedDict()
+        self.profile_cache_hits = 0
+        self.profile_cache_misses = 0
         self.parameter_dimensions = 5
         self.residuals = None
         self.arc_lengths = None
+        self.arc_length_seeds = None # starting arc lengths for the first fitting step
+        self.newton_iterations = 0 # closest-point Newton iterations, summed over the points
+        self.newton_iterations_per_step = None # mean Newton iterations per point at each step of the last fit
+        self.arclength_failures = 0 # points whose Newton search did not converge
+        self.residual_evaluations = 0 # evaluations of the residuals and Jacobian by the fit
+        self.condition_number = None # condition number of the normal matrix at the start of the last fit
+        self.profile_index = None # ProfileIndex of the "kdtree" projection
+        self.fitting_steps = None
+        self.fitting_levels = None # [points, steps] at each resolution of the last fit
+        self.objective_function = None
         # self.fitted = False
         self.needle_diameter_pixels = None
         self.s_left = None
@@ -97,35 +140,89 @@ class DropData(object):
 
     
     # interpolates the theoretical profile data
+    # s may be a single arc length or an array of arc lengths, in which case
+    # each returned component is an array of the same length
     def profile(self, s):
+        if np.ndim(s) != 0:
+            return self.profile_array(np.asarray(s, dtype=float))
         if (s < 0):
             raise ValueError("s value outside domain")
         if (s > self.max_s):
             # if the profile is called outside of the current region, expand
             self.max_s = 1.2 * s # expand region to include s_max
+        c0, c1, c2, c3 = self.hermite_coefficients
         Delta_s = self.max_s / self.s_points
-        n1 = int(s / Delta_s)
-        n2 = n1 + 1
+        n1 = min(int(s / Delta_s), self.s_points - 1)
         t =  s / Delta_s - n1
-        vec1 = np.array(self.theoretical_data[n1])
-        vec2 = np.array(self.theoretical_data[n2])
-        bond_number = self.bond()
-        Dvec1 = np.array(ylderiv(vec1, 0, bond_number))
-        Dvec2 = np.array(ylderiv(vec2, 0, bond_number))
-        value_at_s = cubic_interpolation_function(vec1, vec2, Dvec1, Dvec2, Delta_s, t)
+        value_at_s = c0[:, n1] + t * (c1[:, n1] + t * (c2[:, n1] + t * c3[:, n1]))
         return value_at_s
 
-    # generates a new drop profile
+    # interpolates the theoretical profile data at an array of arc lengths
+    def profile_array(self, s):
+        if np.any(s < 0):
+            raise ValueError("s value outside domain")
+        s_max_requested = np.max(s)
+        if (s_max_requested > self.max_s):
+            # if the profile is called outside of the current region, expand
+            self.max_s = 1.2 * s_max_requested # expand region to include s_max
+        c0, c1, c2, c3 = self.hermite_coefficients
+        t = s / (self.max_s / self.s_points)
+        n1 = t.astype(int)
+        np.minimum(n1, self.s_points - 1, out=n1)
+        t -= n1
+        # Horner evaluation of the cubic on each interval
+        values_at_s = np.take(c3, n1, axis=1, mode='clip')
+        for c in (c2, c1, c0):
+            values_at_s *= t
+            values_at_s += np.take(c, n1, axis=1, mode='clip')
+        return values_at_s
+
+    # the theoretical profile is only generated when it is first needed after
+    # params, max_s or s_points have changed
+    @property
+    def theoretical_data(self):
+        if self._profile_outdated:
+            self.generate_profile_data()
+        return self._theoretical_data
+
+    # cubic Hermite coefficients of each interval of the theoretical profile,
+    # built once per generated profile (see cubic_interpolation_coefficients)
+    @property
+    def hermite_coefficients(self):
+        if self._profile_outdated:
+            self.generate_profile_data()
+        return self._hermite_coefficients
+
+    # generates a new drop profile, reusing a cached profile for the same
+    # (Bond number, max_s, s_points) if one exists
     def generate_profile_data(self):
         if (self._max_s is not None) and (self._s_points is not None) and (self._params is not None):
-        # if [self.max_s, self.s_points, self.params].all():
-            # self.fitted = False
-            # s_data_points = np.arange(0, self.max_s*(1+2/self.s_points), self.max_s/self.s_points)
-            s_data_points = np.linspace(0, self.max_s, self.s_points + 1)
-            # EPS = .000001 # need to use Bessel function Taylor expansion below
-            x_vec_initial = [.000001, 0., 0., 0., 0., 0.]
-            bond_number = self.bond()
-            self.theoretical_data = odeint(ylderiv, x_vec_initial, s_data_points, args=(bond_number,))
+            key = (self.bond(), self.max_s, self.s_points)
+            if key in self.profile_cache:
+                self.profile_cache_hits += 1
+                theoretical_data, hermite_coefficients = self.profile_cache.pop(key) # re-inserted below as most recently used
+            else:
+                self.profile_cache_misses += 1
+                theoretical_data = self.integrate_profile_data()
+                node_derivatives = np.array(ylderiv(theoretical_data.T, 0, self.bond()))
+                hermite_coefficients = cubic_interpolation_coefficients(theoretical_data.T, node_derivatives, self.max_s / self.s_points)
+                if len(self.profile_cache) >= PROFILE_CACHE_SIZE:
+                    self.profile_cache.popitem(last=False) # discard the least recently used profile
+            self.profile_cache[key] = (theoretical_data, hermite_coefficients)
+            self._theoretical_data = theoretical_data
+            self._hermite_coefficients = hermite_coefficients
+            self._profile_outdated = False
+
+    # integrates the Young--Laplace equation for the current parameters
+    def integrate_profile_data(self):
+        s_data_points = np.linspace(0, self.max_s, self.s_points + 1)
+        # EPS = .000001 # need to use Bessel function Taylor expansion below
+        x_vec_initial = [.000001, 0., 0., 0., 0., 0.]
+        bond_number = self.bond()
+        if (self.profile_library is not None) and self.profile_library.covers(bond_number, self.max_s):
+            # interpolate in Bond number from the prebuilt library instead of integrating
+            return self.profile_library.profile_data(bond_number, self.max_s, self.s_points)
+        return odeint(ylderiv, x_vec_initial, s_data_points, args=(bond_number,))
 
     # # generates a new drop profile
     # def generate_profile_volume_area_data(self):
@@ -163,7 +260,7 @@ class DropData(object):
         if len(vector) != self.parameter_dimensions:
             raise ValueError("Parameter array incorrect dimensions")
         self._params = vector
-        self.generate_profile_data() # generate new profile when the parameters are changed
+        self._profile_outdated = True # generate new profile when the parameters are changed
 
     # generate new profile when max_s is changed
     @property
@@ -175,7 +272,7 @@ class DropData(object):
         if value <= 0:
             raise ValueError("Maximum arc length must be positive")
         self._max_s = float(value)
-        self.generate_profile_data() # generate new profile when the maximum arc length is changed
+        self._profile_outdated = True # generate new profile when the maximum arc length is changed
 
     # test validity of variable s_points + generate new profile when s_points are 
     @property
@@ -189,7 +286,7 @@ class DropData(object):
         if not isinstance(value, int):
             raise ValueError("Number of points must be an integer")
         self._s_points = value
-        self.generate_profile_data() # generate new profile when the maximum arc length is changed
+        self._profile_outdated = True # generate new profile when the number of points is changed
 
     # def calculate_interfacial_tension(self):
     #     if self.fitted:
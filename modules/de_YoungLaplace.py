@@ -16,6 +16,23 @@ def ylderiv(x_vec, t, bond_number):
     phi_Bond_s = y_s * x_Bond / (x*x) - x_s * phi_Bond / x - y - bond_number * y_Bond
     return [x_s, y_s, phi_s, x_Bond_s, y_Bond_s, phi_Bond_s]
 
+# the Young--Laplace system with the first and second-order Bond sensitivities,
+# which the profile library needs to interpolate the first-order ones in Bond
+# number as it does the profile
+def ylderiv2(x_vec, t, bond_number):
+    x, y, phi, x_Bond, y_Bond, phi_Bond, x_Bond2, y_Bond2, phi_Bond2 = x_vec
+    x_s = cos(phi)
+    y_s = sin(phi)
+    phi_s = 2 - bond_number * y - y_s/x
+    x_Bond_s = - y_s * phi_Bond
+    y_Bond_s = x_s * phi_Bond
+    phi_Bond_s = y_s * x_Bond / (x*x) - x_s * phi_Bond / x - y - bond_number * y_Bond
+    x_Bond2_s = - x_s * phi_Bond**2 - y_s * phi_Bond2
+    y_Bond2_s = - y_s * phi_Bond**2 + x_s * phi_Bond2
+    phi_Bond2_s = (y_s * (x_Bond2 + x * phi_Bond**2) + 2 * x_s * phi_Bond * x_Bond) / (x*x) - 2 * y_s * x_Bond**2 / (x*x*x) \
+        - x_s * phi_Bond2 / x - 2 * y_Bond - bond_number * y_Bond2
+    return [x_s, y_s, phi_s, x_Bond_s, y_Bond_s, phi_Bond_s, x_Bond2_s, y_Bond2_s, phi_Bond2_s]
+
 # defines the Young--Laplace system of differential equations to be solved
 def dataderiv(x_vec, t, bond_number):
     x, y, phi, vol, sur = x_vec
@@ -10,13 +10,17 @@ BLUR_SIZE = 3
 VERSION_CV2 = cv2.__version__
 
 def extract_drop_profile(raw_experiment, user_inputs):
-    profile_crop = image_crop(raw_experiment.image, user_inputs.drop_region)
+    image = raw_experiment.image
+    raw_experiment.image_height = image.shape[0]
+    if not user_inputs.profiles_boole:
+        raw_experiment.image = None # only the regions are used from here on (the profile plot shows the frame)
+    profile_crop = image_crop(image, user_inputs.drop_region)
     # profile_edges = detect_edges(profile_crop, raw_experiment, user_inputs.drop_region)
     # profile, raw_experiment.ret = detect_edges(profile_crop, raw_experiment, user_inputs.drop_region)
     profile, raw_experiment.ret = detect_edges(profile_crop, raw_experiment, user_inputs.drop_region, -1, 1)
     raw_experiment.drop_data = profile[0]
 
-    needle_crop = image_crop(raw_experiment.image, user_inputs.needle_region)
+    needle_crop = image_crop(image, user_inputs.needle_region)
     raw_experiment.needle_data, ret = detect_edges(needle_crop, raw_experiment, user_inputs.needle_region, raw_experiment.ret, 2)
 
     
@@ -34,6 +38,20 @@ def image_crop(image, points):
     # pixels are referenced as image[y][x] - row major order
     return image[int(points[0][1]):int(points[1][1]), int(points[0][0]):int(points[1][0])]
 
+# returns the indices of the n_contours longest contours, longest first - with
+# CHAIN_APPROX_NONE every step along a contour has length 1 or sqrt(2), so
+# only contours with enough points to possibly be among the longest are
+# measured with cv2.arcLength
+def longest_contours(contours, n_contours):
+    if len(contours) == 0:
+        return np.array([], dtype=int)
+    n_points = np.array([len(contour) for contour in contours])
+    k = min(n_contours, len(contours))
+    shortest_of_longest = np.partition(n_points, -k)[-k] - 1 # lower bound on the k-th longest length
+    candidates = np.nonzero(np.sqrt(2) * (n_points - 1) >= shortest_of_longest)[0]
+    contour_lengths = np.array([cv2.arcLength(contours[index],0) for index in candidates])
+    return candidates[contour_lengths.argsort()[::-1][:n_contours]]
+
 def detect_edges(image, raw_experiment, points, ret, n_contours):
     # image = np.flipud(imageUD)
     if len(image.shape) != 2:
@@ -52,28 +70,21 @@ def detect_edges(image, raw_experiment, points, ret, n_contours):
     # error in PDT code - shouldn't threshold before Canny - otherwise Canny is useless
     edges = cv2.Canny(blur,0.5*ret,ret) # detect edges using Canny edge detection
 
+    # only the outer lengths are needed, so the contour hierarchy is not built
     if float(VERSION_CV2[0]) > 2: #Version 3 of opencv returns an extra argument
-        _,contours, hierarchy = cv2.findContours(edges,cv2.RETR_TREE,cv2.CHAIN_APPROX_NONE)
+        _,contours, hierarchy = cv2.findContours(edges,cv2.RETR_LIST,cv2.CHAIN_APPROX_NONE)
     else:
-        contours, hierarchy = cv2.findContours(edges,cv2.RETR_TREE,cv2.CHAIN_APPROX_NONE)
-
-    contour_lengths = [] #list to hold all areas
-
-    for contour in contours:
-      length = cv2.arcLength(contour,0)
-      contour_lengths.append(length)
+        contours, hierarchy = cv2.findContours(edges,cv2.RETR_LIST,cv2.CHAIN_APPROX_NONE)
 
-    indexed_contour_lengths = np.array(contour_lengths).argsort()[::-1]
-    indexed_contours_to_return = indexed_contour_lengths[:n_contours]
+    indexed_contours_to_return = longest_contours(contours, n_contours)
 
-    image_height = raw_experiment.image.shape[0]
-    offset = [points[0][0], image_height - points[0][1]]
+    # converts the data to (x, y) data where (0, 0) is the lower-left pixel
+    image_height = raw_experiment.image_height
+    offset = np.array([points[0][0], image_height - points[0][1]])
     points = []
     for index in indexed_contours_to_return:
         current_contour = contours[index][:,0]
-        for i in range(current_contour.shape[0]):
-            current_contour[i,1] = - current_contour[i,1]
-            current_contour[i,:] = current_contour[i,:] + offset
+        current_contour = (current_contour * [1, -1] + offset).astype(current_contour.dtype)
         points.append(current_contour[current_contour[:,1].argsort()])
 
     return points, ret
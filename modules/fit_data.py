@@ -2,108 +2,175 @@
 #coding=utf-8
 from __future__ import print_function
 import numpy as np
-from jacobian import rowJacobian
-from FittingPlots import FittingPlots
+from jacobian import fullJacobian
+from solvers import SOLVERS, normal_equations
 
 np.set_printoptions(suppress=True)
 np.set_printoptions(precision=3)
 
 dot = np.dot
 
-# implements the Levenberg--Marquardt--Fletcher algorithm to find parameters
-# Levenberg--Marquardt--Fletcher Automated Optimisation
+REUSE_ARC_LENGTHS = True # seed the closest-point search of each point from its arc length at the previous step
+ARC_LENGTH_REUSE_TOL = 1.e-2 # relative parameter change above which the nearest profile node is used instead
+
+# fits the parameters of drop_data to the drop profile with the solver
+# tolerances.SOLVER (see solvers.py, Levenberg--Marquardt--Fletcher by default)
+# if tolerances.MULTIRESOLUTION_POINTS is set, the first steps are taken on
+# decimated subsets of the contour, moving to the next (larger) subset once the
+# relative parameter change drops below tolerances.MULTIRESOLUTION_TOL, and
+# the fit always finishes on the full contour
+# the closest-point search of each contour point starts from the arc length
+# found for that point at the previous step (or, at the first step, from
+# drop_data.arc_length_seeds, e.g. the previous frame's), unless the step
+# changed the parameters by more than ARC_LENGTH_REUSE_TOL
 def fit_experimental_drop(experimental_drop, drop_data, user_inputs, tolerances):
-    fitting_plots = FittingPlots()
-    degrees_of_freedom = len(experimental_drop.drop_data) - drop_data.parameter_dimensions + 1
-    RHO = 0.25
-    SIGMA = 0.75
-    lmbda = 0 # initialise value of lambda
-    steps_LMF = 0 # number of steps taken
+    if tolerances.SOLVER not in SOLVERS:
+        raise ValueError("Solver must be one of " + ", ".join(sorted(SOLVERS)))
+    solver = SOLVERS[tolerances.SOLVER]
+    fitting_plots = None
+    if user_inputs.profiles_boole or user_inputs.residuals_boole:
+        from FittingPlots import FittingPlots # matplotlib is only needed when plotting
+        fitting_plots = FittingPlots()
+    problem = FitProblem(experimental_drop, drop_data, user_inputs, tolerances, fitting_plots)
+    drop_data.fitting_levels = []
+    drop_data.newton_iterations_per_step = []
     intialise_print_output()
-    # drop_data.s_0 = 0.05 * drop_data.max_s
-    #drop_data.s_left = 0.05 * drop_data.max_s   JB edit 26/3/15
-    #drop_data.s_right = 0.05 * drop_data.max_s JB edit 26/3/15
-    loop = True
-    while(loop):
-        drop_data.s_left = 0.05 * drop_data.max_s #JB edit 26/3/15
-        drop_data.s_right = 0.05 * drop_data.max_s #JB edit 26/3/15
-
-        drop_data.previous_params = drop_data.params
-        A, v, Snew = calculate_A_v_S(experimental_drop, drop_data, tolerances)
-        if lmbda != 0:
-            A_plus_lambdaI = A + lmbda * np.diag(np.diag(A))
-        else:
-            A_plus_lambdaI = A
-        inv = inverse_matrix(A_plus_lambdaI)
-        delta = -dot(inv, v).T
-        if steps_LMF == 0: # initialisation step
-            drop_data.params = drop_data.params + (delta)[0]
-            Sold = Snew # initialisation step
-        else:
-            R = (Sold - Snew) / (dot(delta, (-2 * v - dot(A.T, delta.T))))
-            if R < RHO:
-                nu = bounded_2_to_10( 2 - (Snew - Sold)/(dot(delta, v)) )
-                if lmbda == 0:
-                    lmbdaC = 1/max([abs(inv[i][i]) for i in range(0, len(inv))])
-                    lmbda = lmbdaC # calculate lambda_c and set lambda
-                    nu = nu / 2
-                lmbda = nu * lmbda # rescale lambda
-            if R > SIGMA:
-                if lmbda != 0:
-                    lmbda = lmbda / 2
-                    if lmbda < lmbdaC:
-                        lmbda = 0
-            deltaS = Snew - Sold # calculate reduction in objective function
-            if deltaS < 0:
-                drop_data.params = drop_data.params + (delta)[0] # if objective reduces accept
-                Sold = Snew
-        objective_function = Snew / degrees_of_freedom
-        steps_LMF += 1
-        print_current_parameters(steps_LMF, objective_function, drop_data.params)
-
-        fitting_plots.update_plots(experimental_drop, drop_data, user_inputs)
-
-        loop = to_continue(delta[0] / drop_data.params, v, objective_function, steps_LMF, tolerances)
+    params = np.array(drop_data.params, dtype=float)
+    levels = resolution_levels(experimental_drop.drop_data, drop_data, tolerances)
+    for level, indices in enumerate(levels):
+        if level > 0:
+            print("Continuing with %d points" % len(indices))
+        problem.set_level(indices, level == len(levels) - 1)
+        if level == 0:
+            problem.record_condition_number(params)
+        params = solver(problem, params)
+        drop_data.fitting_levels.append([len(indices), problem.level_steps])
+    drop_data.params = params
     drop_data.fitted = True
-
-# ensure nu is between 2 and 10
-def bounded_2_to_10(nu):
-    if nu < 2:
-        nu = 2  # rescale nu if too small
-    elif nu > 10:
-        nu = 10 # rescale nu if too large
-    return nu
-
-def inverse_matrix(matrix):
-    # check if matrix is singular via 
-    # condition_number = np.linalg.cond(matrix)
-    return np.linalg.inv(matrix)
-
-
-def calculate_A_v_S(experimental_drop, drop_data, tolerances):
-    lenpoints = len(experimental_drop.drop_data)
-    m_parameters = len(drop_data.params)
-    A = np.empty((m_parameters, m_parameters))
-    A.fill(0.0)
-    v = np.empty((m_parameters, 1))
-    v.fill(0.0)
-    S = 0.0
-    residual_vector = np.zeros(lenpoints)
-    arc_lengths_vector = np.zeros(lenpoints)
-    # residual_vector.fill(0)
-    for i in range(0, lenpoints):
-        x, y  = experimental_drop.drop_data[i]
-        JACrowi, residual_vector[i] = rowJacobian(x, y, drop_data, tolerances) # calculate the Jacobian and resiual for each point
-        # arc_lengths_vector[i] = drop_data.s_0
-        arc_lengths_vector[i] = drop_data.s_previous
-        S += residual_vector[i]**2
-        for j in range(0, m_parameters):
-            v[j] += JACrowi[j]*residual_vector[i]
-            for k in range(0, j+1):
-                A[j][k] += JACrowi[j]*JACrowi[k]
-    for j in range(0, m_parameters):
-        for k in range(j, m_parameters):
-            A[j][k] = A[k][j]
+    drop_data.fitting_steps = problem.steps
+    drop_data.objective_function = problem.objective_function
+    drop_data.arc_length_seeds = None
+
+# The residual/Jacobian callbacks the solvers fit through (see solvers.py),
+# on the contour points of the current resolution level, keeping the count of
+# steps and the convergence tests
+class FitProblem(object):
+    def __init__(self, experimental_drop, drop_data, user_inputs, tolerances, fitting_plots=None):
+        self.experimental_drop = experimental_drop
+        self.drop_data = drop_data
+        self.user_inputs = user_inputs
+        self.tolerances = tolerances
+        self.fitting_plots = fitting_plots
+        self.steps = 0 # number of steps taken
+        self.level_steps = 0 # number of steps taken at the current resolution
+        self.objective_function = None
+        self.arc_length_seeds = np.full(len(experimental_drop.drop_data), np.nan) # NaN: start from the nearest profile node
+        self.seed_params = None # parameters the seeds were found at
+        if (drop_data.arc_length_seeds is not None) and (len(drop_data.arc_length_seeds) == len(self.arc_length_seeds)):
+            self.arc_length_seeds[:] = drop_data.arc_length_seeds
+            self.seed_params = np.array(drop_data.params, dtype=float)
+        self.cached = None # [params, jacobian, residuals, arc lengths] of the last evaluation
+        self.newton_iterations = drop_data.newton_iterations # at the last iterate
+
+    # fits the contour points indices from now on, the full contour if final
+    def set_level(self, indices, final):
+        self.indices = indices
+        self.final = final
+        self.xy = self.experimental_drop.drop_data[indices]
+        self.degrees_of_freedom = len(self.xy) - self.drop_data.parameter_dimensions + 1
+        self.level_steps = 0
+        self.cached = None
+
+    # records the condition number of the normal matrix at params - pixel
+    # lengths, the Bond number and the rotation differ in sensitivity by
+    # orders of magnitude
+    def record_condition_number(self, params):
+        jacobian = self.jacobian_residuals(params)[0]
+        self.drop_data.condition_number = np.linalg.cond(dot(jacobian.T, jacobian))
+
+    # the Jacobian and residuals at an iterate of the solver
+    def evaluate(self, params):
+        if not self.seeds_apply(params):
+            self.arc_length_seeds[:] = np.nan # after a large step the nearest profile node is the safer start
+        jacobian, residuals, arc_lengths = self.jacobian_residuals(params)
+        drop_data = self.drop_data
+        drop_data.previous_params = params
+        drop_data.residuals = residuals
+        drop_data.arc_lengths = arc_lengths
+        drop_data.newton_iterations_per_step.append((drop_data.newton_iterations - self.newton_iterations) / float(len(self.xy)))
+        self.newton_iterations = drop_data.newton_iterations
+        if REUSE_ARC_LENGTHS:
+            self.arc_length_seeds[self.indices] = arc_lengths
+            self.seed_params = np.array(params, dtype=float)
+        else:
+            self.seed_params = None
+        return [jacobian, residuals]
+
+    def residuals(self, params):
+        return self.jacobian_residuals(params)[1]
+
+    def objective(self, params):
+        residuals = self.residuals(params)
+        return dot(residuals, residuals)
+
+    # evaluates the Jacobian, residuals and arc lengths at params, or returns
+    # those of the last evaluation if it was at params
+    def jacobian_residuals(self, params):
+        if (self.cached is not None) and np.array_equal(self.cached[0], params):
+            return self.cached[1:]
+        self.drop_data.params = params
+        s_initial = self.arc_length_seeds[self.indices] if self.seeds_apply(params) else None
+        jacobian, residuals, arc_lengths = fullJacobian(self.xy, self.drop_data, self.tolerances, s_initial)
+        self.drop_data.residual_evaluations += 1
+        self.cached = [np.array(params, dtype=float), jacobian, residuals, arc_lengths]
+        return self.cached[1:]
+
+    # whether the arc lengths found at seed_params are close enough to start
+    # the closest-point search at params
+    def seeds_apply(self, params):
+        return (self.seed_params is not None) and (np.max(np.abs((params - self.seed_params) / params)) <= ARC_LENGTH_REUSE_TOL)
+
+    # records a step to params and returns whether to continue - at a coarse
+    # level until the relative parameter change is below MULTIRESOLUTION_TOL,
+    # on the full contour until one of the convergence tests is met
+    def step_taken(self, params, delta, v, S):
+        self.drop_data.params = params
+        self.objective_function = S / self.degrees_of_freedom
+        self.steps += 1
+        self.level_steps += 1
+        print_current_parameters(self.steps, self.objective_function, params)
+        if not self.final:
+            return not ((max(abs(delta / params)) < self.tolerances.MULTIRESOLUTION_TOL) or maximum_steps_exceeded(self.steps, self.tolerances))
+        if self.fitting_plots is not None:
+            self.fitting_plots.update_plots(self.experimental_drop, self.drop_data, self.user_inputs)
+        return to_continue(delta / params, v, self.objective_function, self.steps, self.tolerances)
+
+# returns the indices of the data points used at each resolution, from the
+# coarsest to the full contour
+def resolution_levels(xy, drop_data, tolerances):
+    x_apex = drop_data.params[0]
+    levels = [decimate_contour(xy, n_points, x_apex) for n_points in sorted(tolerances.MULTIRESOLUTION_POINTS) if n_points < len(xy)]
+    return levels + [np.arange(len(xy))]
+
+# returns the indices of about n_points of the contour xy spaced uniformly in
+# arc length along each side of the drop - the contour is sorted by height,
+# which is the order along each side of a pendant drop
+def decimate_contour(xy, n_points, x_apex):
+    sides = [np.nonzero(xy[:, 0] < x_apex)[0], np.nonzero(xy[:, 0] >= x_apex)[0]]
+    cumulative_lengths = [np.concatenate(([0], np.cumsum(np.hypot(*np.diff(xy[side], axis=0).T)))) for side in sides if len(side) > 1]
+    total_length = sum(lengths[-1] for lengths in cumulative_lengths)
+    indices = []
+    for side, lengths in zip([side for side in sides if len(side) > 1], cumulative_lengths):
+        n_side = max(2, int(round(n_points * lengths[-1] / total_length)))
+        selected = np.searchsorted(lengths, np.linspace(0, lengths[-1], n_side))
+        indices.append(side[np.unique(np.minimum(selected, len(side) - 1))])
+    return np.sort(np.concatenate(indices))
+
+# builds the normal matrix A = J^T J, the gradient vector v = J^T e and the
+# objective S = e^T e from the full Jacobian of the data points xy
+def calculate_A_v_S(xy, drop_data, tolerances, s_initial=None):
+    jacobian, residual_vector, arc_lengths_vector = fullJacobian(xy, drop_data, tolerances, s_initial)
+    A, v, S = normal_equations(jacobian, residual_vector)
     drop_data.residuals = residual_vector
     drop_data.arc_lengths = arc_lengths_vector
     return [A, v, S]
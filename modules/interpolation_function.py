@@ -14,6 +14,17 @@ def cubic_interpolation_function(y_1, y_2, k_1, k_2, Delta_x, t):
     q = (1 - t) * y_1 + t * y_2 + t * (1 - t) * (a * (1 - t) + b * t)
     return q
 
+# coefficients of the cubic spline interpolation function on each interval
+# y[:, n] = q (x_n),  k[:, n] = q'(x_n) for equally spaced nodes x_n
+# q(x) = c_0 + c_1 t + c_2 t^2 + c_3 t^3 for x_n <= x <= x_(n+1)
+# returns [c_0, c_1, c_2, c_3], each with one column per interval
+def cubic_interpolation_coefficients(y, k, Delta_x):
+    y_1 = y[:, :-1]
+    y_2 = y[:, 1:]
+    a =  k[:, :-1] * Delta_x - (y_2 - y_1)
+    b = -k[:, 1:] * Delta_x + (y_2 - y_1)
+    return [np.ascontiguousarray(y_1), y_2 - y_1 + a, b - 2 * a, a - b]
+
 # linear spline interpoation function
 # y_1 = q (x_1),  y_2 = q (x_2) 
 # t = (x - x_1) / (x_2 - x_1)
@@ -1,8 +1,10 @@
 #!/usr/bin/env python
 #coding=utf-8
+from __future__ import print_function
 # from scipy.integrate import odeint
 import numpy as np
 import math
+from scipy.spatial import cKDTree
 # import sys
 # from classes import ExperimentalDrop, DropData, Tolerances
 
@@ -12,6 +14,13 @@ dot = np.dot
 sqrt = math.sqrt
 minv = np.linalg.inv
 
+# how the closest theoretical point to each data point is found (see
+# fullJacobian): "newton" iterates from a starting arc length, "kdtree"
+# projects onto a densely sampled profile without iterating
+PROJECTIONS = ["newton", "kdtree"]
+PROJECTION_SAMPLES = 500 # samples of the profile searched by the "kdtree" projection
+PROJECTION_EXTRAPOLATION = 0.2 # fraction of max_s a point may project beyond the end of the profile
+
 # calculates a Jacobian row for the data point xy = x, y
 def rowJacobian(x, y, drop_data, tolerances):
     [xP, yP, RP, BP, wP] = drop_data.params
@@ -43,6 +52,157 @@ def rowJacobian(x, y, drop_data, tolerances):
     ddi_dwP = (e_r * sgnx * (- (x - xP) * sin(wP) - (y - yP) * cos(wP)) + e_z * ( (x - xP) * cos(wP) - (y - yP) * sin(wP))) / e_i
     return [[ ddi_dxP, ddi_dyP, ddi_dRP, ddi_dBP, ddi_dwP], e_i]
 
+# calculates the full Jacobian matrix and the residual vector for all data points
+# in xy in one pass - returns the (N x 5) Jacobian, the N residuals and the N
+# arc lengths of the closest theoretical points
+# s_initial optionally gives the starting arc length of each point, NaN for
+# points without one
+def fullJacobian(xy, drop_data, tolerances, s_initial=None):
+    [xP, yP, RP, BP, wP] = drop_data.params
+    x = xy[:, 0]
+    y = xy[:, 1]
+    x_rotated = (x - xP) * cos(wP) - (y - yP) * sin(wP)
+    y_rotated = (x - xP) * sin(wP) + (y - yP) * cos(wP)
+    if tolerances.PROJECTION == "kdtree":
+        xs, ys, dx_dBs, dy_dBs, e_r, e_z, s_i = projected_arclengths(x_rotated, y_rotated, drop_data, tolerances) # functions at s*
+    elif tolerances.PROJECTION == "newton":
+        if (s_initial is not None) and (len(s_initial) == len(xy)):
+            s_0 = np.array(s_initial, dtype=float)
+            unseeded = np.isnan(s_0)
+            if unseeded.any():
+                s_0[unseeded] = initial_arclengths(x_rotated[unseeded], y_rotated[unseeded], drop_data)
+        else:
+            s_0 = initial_arclengths(x_rotated, y_rotated, drop_data)
+        xs, ys, dx_dBs, dy_dBs, e_r, e_z, s_i = minimum_arclengths(x_rotated, y_rotated, s_0, drop_data, tolerances) # functions at s*
+    else:
+        raise ValueError("Projection must be one of " + ", ".join(PROJECTIONS))
+    e_i = np.copysign(np.sqrt(e_r**2 + e_z**2), e_r) # actual residuals
+    sgnx = np.copysign(1, x_rotated) # signs for ddi_dX0
+    jacobian = np.empty((len(xy), drop_data.parameter_dimensions))
+    jacobian[:, 0] = -( e_r * sgnx * cos(wP) + e_z * sin(wP)) / e_i # derivative w.r.t. X_0 (x at apex)
+    jacobian[:, 1] = -(-e_r * sgnx * sin(wP) + e_z * cos(wP)) / e_i # derivative w.r.t. Y_0 (y at apex)
+    jacobian[:, 2] = -( e_r * xs + e_z * ys) / e_i # derivative w.r.t. RP (apex radius)
+    jacobian[:, 3] = - RP * (e_r * dx_dBs + e_z * dy_dBs) / e_i # derivative w.r.t. Bo  (Bond number)
+    jacobian[:, 4] = (- e_r * sgnx * y_rotated + e_z * x_rotated) / e_i # derivative w.r.t. w (rotation)
+    return [jacobian, e_i, s_i]
+
+# estimates the arc length of the closest theoretical point to each data point
+# (given in the rotated frame of the drop) from the nearest profile node
+def initial_arclengths(x_rotated, y_rotated, drop_data):
+    RP = drop_data.params[2]
+    nodes = RP * np.asarray(drop_data.theoretical_data)[:, :2]
+    distances = (np.abs(x_rotated)[:, None] - nodes[:, 0])**2 + (y_rotated[:, None] - nodes[:, 1])**2
+    s_nodes = np.linspace(0, drop_data.max_s, drop_data.s_points + 1)
+    return s_nodes[np.argmin(distances, axis=1)]
+
+# calculates the minimum theoretical points to all points (x_rotated, y_rotated)
+# simultaneously - the Newton iterations of every point are advanced together
+# and points are masked off as they converge - the Newton iterations of all
+# points are counted in drop_data.newton_iterations. A point has converged
+# once its residual is normal to the profile (as in projected_arclengths) to
+# within RP * ARCLENGTH_TOL**2 - the accuracy Newton's quadratic convergence
+# gives after a step below ARCLENGTH_TOL - so the values returned are those at
+# the arc lengths returned, whatever arc lengths the searches started from.
+def minimum_arclengths(x_rotated, y_rotated, s_initial, drop_data, tolerances):
+    [xP, yP, RP, BP, wP] = drop_data.params # unpack parameters
+    n_points = len(x_rotated)
+    s_i = np.array(s_initial, dtype=float)
+    xs, ys, dx_dBs, dy_dBs, e_r, e_z = np.zeros((6, n_points))
+    flag_bump = np.zeros(n_points, dtype=int)
+    active = np.arange(n_points)
+    s_step = 0
+    while active.size > 0:
+        drop_data.newton_iterations += active.size
+        s_active = s_i[active]
+        xs_a, ys_a, phis_a, dx_dBs_a, dy_dBs_a, dphi_dBs_a = drop_data.profile(s_active)
+        e_r_a = np.abs(x_rotated[active]) - RP * xs_a
+        e_z_a = y_rotated[active] - RP * ys_a
+        xs[active], ys[active] = xs_a, ys_a
+        dx_dBs[active], dy_dBs[active] = dx_dBs_a, dy_dBs_a
+        e_r[active], e_z[active] = e_r_a, e_z_a
+        s_step += 1
+        converged = (flag_bump[active] >= 2) | (np.abs(e_r_a * cos(phis_a) + e_z_a * sin(phis_a)) <= RP * tolerances.ARCLENGTH_TOL**2) # pushed back twice - abort
+        active = active[~converged]
+        if active.size == 0:
+            break
+        if s_step >= tolerances.MAXIMUM_ARCLENGTH_STEPS:
+            print("s failed to converge in ", str(s_step), " steps for ", str(active.size), " points...")
+            drop_data.arclength_failures += active.size
+            break
+        s_active, phis_a, ys_a, xs_a = s_active[~converged], phis_a[~converged], ys_a[~converged], xs_a[~converged]
+        e_r_a, e_z_a = e_r_a[~converged], e_z_a[~converged]
+        dphi_ds = 2 - BP * ys_a - sin(phis_a) / xs_a
+        s_iplus1 = s_active - f_Newton(e_r_a, e_z_a, phis_a, dphi_ds, RP)
+        bumped = s_iplus1 < 0 # arc length outside integrated region
+        s_iplus1[bumped] = 0
+        flag_bump[active] += bumped
+        s_i[active] = s_iplus1
+    return [xs, ys, dx_dBs, dy_dBs, e_r, e_z, s_i]
+
+# Samples of the dimensionless profile of a DropData in a KD-tree - the tree
+# only depends on the Bond number and max_s, so it is reused while the fit
+# changes the apex position, radius and rotation only
+class ProfileIndex(object):
+    def __init__(self, drop_data, n_samples=PROJECTION_SAMPLES):
+        self.key = profile_index_key(drop_data)
+        self.s = np.linspace(0, drop_data.max_s, n_samples)
+        self.points = np.column_stack(drop_data.profile(self.s)[:2])
+        self.tree = cKDTree(self.points, balanced_tree=False, compact_nodes=False) # quicker to build for points along a curve
+
+    # projects points onto the polyline segments either side of their nearest
+    # samples - returns the arc lengths and the range of arc lengths of those
+    # segments, which may extend beyond the end of the profile
+    def project(self, points):
+        n_samples = len(self.s)
+        nearest = self.tree.query(points)[1]
+        s_projected = np.zeros(len(points))
+        best_distances = np.full(len(points), np.inf)
+        max_s = self.s[-1]
+        for start in [np.maximum(nearest - 1, 0), np.minimum(nearest, n_samples - 2)]:
+            segment = self.points[start + 1] - self.points[start]
+            t = np.sum((points - self.points[start]) * segment, axis=1) / np.sum(segment**2, axis=1)
+            last = start == n_samples - 2
+            t = np.clip(t, 0, np.where(last, 1 + PROJECTION_EXTRAPOLATION * max_s / (self.s[1] - self.s[0]), 1))
+            distances = np.sum((self.points[start] + t[:, None] * segment - points)**2, axis=1)
+            closer = distances < best_distances
+            best_distances[closer] = distances[closer]
+            s_projected[closer] = self.s[start[closer]] + t[closer] * (self.s[1] - self.s[0])
+        lower = self.s[np.maximum(nearest - 1, 0)]
+        upper = np.where(nearest >= n_samples - 2, (1 + PROJECTION_EXTRAPOLATION) * max_s, self.s[np.minimum(nearest + 1, n_samples - 1)])
+        return [s_projected, lower, np.maximum(upper, s_projected)]
+
+def profile_index_key(drop_data):
+    return (drop_data.bond(), drop_data.max_s)
+
+# finds the closest theoretical points to all points (x_rotated, y_rotated)
+# without iterating: the points are projected onto a dense polyline of the
+# profile (see ProfileIndex), and the points whose residual still has a
+# component along the profile larger than the arc length tolerance get one
+# Newton step, kept within the segments around their projection - so the
+# cost is fixed and the search cannot diverge. Returns the same values as
+# minimum_arclengths.
+def projected_arclengths(x_rotated, y_rotated, drop_data, tolerances):
+    [xP, yP, RP, BP, wP] = drop_data.params # unpack parameters
+    if (drop_data.profile_index is None) or (drop_data.profile_index.key != profile_index_key(drop_data)):
+        drop_data.profile_index = ProfileIndex(drop_data)
+    points = np.column_stack((np.abs(x_rotated), y_rotated)) / RP
+    s_i, lower, upper = drop_data.profile_index.project(points)
+    xs, ys, phis, dx_dBs, dy_dBs, dphi_dBs = drop_data.profile(s_i)
+    e_r = np.abs(x_rotated) - RP * xs
+    e_z = y_rotated - RP * ys
+    drop_data.newton_iterations += len(s_i)
+    refine = np.nonzero(np.abs(e_r * cos(phis) + e_z * sin(phis)) > RP * tolerances.ARCLENGTH_TOL)[0]
+    if refine.size > 0:
+        dphi_ds = 2 - BP * ys[refine] - sin(phis[refine]) / xs[refine]
+        s_refined = s_i[refine] - f_Newton(e_r[refine], e_z[refine], phis[refine], dphi_ds, RP)
+        s_i[refine] = np.clip(s_refined, lower[refine], upper[refine])
+        xs_r, ys_r, phis_r, dx_dBs_r, dy_dBs_r, dphi_dBs_r = drop_data.profile(s_i[refine])
+        xs[refine], ys[refine], dx_dBs[refine], dy_dBs[refine] = xs_r, ys_r, dx_dBs_r, dy_dBs_r
+        e_r[refine] = np.abs(x_rotated[refine]) - RP * xs_r
+        e_z[refine] = y_rotated[refine] - RP * ys_r
+        drop_data.newton_iterations += refine.size
+    return [xs, ys, dx_dBs, dy_dBs, e_r, e_z, s_i]
+
 # calculates the minimum theoretical point to the point (x,y)
 def minimum_arclength(x, y, s_i, drop_data, tolerances):
     [xP, yP, RP, BP, wP] = drop_data.params # unpack parameters
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+#coding=utf-8
+# Fits the frames of a "Local images" run on a pool of worker processes.
+# Frames are handed out in chunks of consecutive frames, so that each worker
+# can still warm start from the previous frame within its chunk.
+from __future__ import print_function
+from classes import ExperimentalDrop, DropData
+from ExtractData import ExtractedData
+from read_image import image_from_harddrive, get_import_filename
+from analyse_drop import analyse_drop
+from generate_data import generate_full_data
+from profile_library import load_profile_library
+
+import copy
+import multiprocessing
+import os
+
+CHUNK_SIZE = 10
+
+# yields (frame number, chunk data, index in chunk) in frame order, where the
+# chunk data is an ExtractedData holding the results of a chunk of frames with
+# times given as file modification times
+def fit_local_images(user_inputs, tolerances, n_workers, chunk_size=CHUNK_SIZE, warm_start=None):
+    n_frames = user_inputs.number_of_frames
+    worker_inputs = copy.copy(user_inputs)
+    worker_inputs.residuals_boole = 0 # workers cannot draw the fitting plots
+    worker_inputs.profiles_boole = 0
+    chunks = [(worker_inputs, tolerances, warm_start, list(range(start, min(start + chunk_size, n_frames))))
+              for start in range(0, n_frames, chunk_size)]
+    pool = multiprocessing.Pool(n_workers)
+    try:
+        for frame_numbers, chunk_data in pool.imap(fit_chunk, chunks):
+            for j, i in enumerate(frame_numbers):
+                yield i, chunk_data, j
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+# fits a chunk of consecutive frames in a worker process
+def fit_chunk(args):
+    user_inputs, tolerances, warm_start, frame_numbers = args
+    fitted_drop_data = DropData()
+    fitted_drop_data.profile_library = load_profile_library()
+    chunk_data = ExtractedData(len(frame_numbers), fitted_drop_data.parameter_dimensions)
+    chunk_data.initial_image_time = 0
+    for j, i in enumerate(frame_numbers):
+        raw_experiment = ExperimentalDrop()
+        image_from_harddrive(raw_experiment, user_inputs, i)
+        raw_experiment.time = os.path.getmtime(get_import_filename(user_inputs, i))
+        analyse_drop(raw_experiment, fitted_drop_data, user_inputs, tolerances, warm_start)
+        generate_full_data(chunk_data, raw_experiment, fitted_drop_data, user_inputs, j)
+    return [frame_numbers, chunk_data]
+
+# copies frame j of chunk_data into frame i of extracted_data
+def copy_frame(extracted_data, i, chunk_data, j):
+    if i == 0:
+        extracted_data.initial_image_time = chunk_data.time[j]
+    extracted_data.time[i] = chunk_data.time[j] - extracted_data.initial_image_time
+    extracted_data.gamma_IFT_mN[i] = chunk_data.gamma_IFT_mN[j]
+    extracted_data.pixels_to_mm[i] = chunk_data.pixels_to_mm[j]
+    extracted_data.volume[i] = chunk_data.volume[j]
+    extracted_data.area[i] = chunk_data.area[j]
+    extracted_data.worthington[i] = chunk_data.worthington[j]
+    extracted_data.parameters[i] = chunk_data.parameters[j]
+    extracted_data.record_schedule(i, chunk_data.missed_deadlines[j], chunk_data.backlog[j])
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+#coding=utf-8
+# Runs the processing of successive frames as a pipeline: a source thread
+# produces items and each stage thread takes the items of the previous stage
+# from a queue, so that e.g. the next frame is acquired while the
+# current one is fitted. The results are returned to the calling thread in
+# order, which is where plotting has to happen.
+from __future__ import print_function
+try:
+    # for Python2
+    import Queue as queue
+except ImportError:
+    # for Python3
+    import queue
+import threading
+import timeit
+import traceback
+
+import numpy as np
+
+QUEUE_SIZE = 2 # items waiting between two stages
+QUEUE_POLL_TIME = 0.5 # seconds between checks for the pipeline being stopped
+
+# marks the end of the items
+END_OF_ITEMS = None
+
+# passed down the pipeline in place of items when a stage fails
+class StageError(object):
+    def __init__(self, name, exception):
+        self.name = name
+        self.exception = exception
+
+class PipelineStage(object):
+    def __init__(self, name, function, queue_size):
+        self.name = name
+        self.function = function
+        self.output = queue.Queue(queue_size)
+        self.queue_depths = [] # items waiting in the output queue after each put
+        self.waiting_times = [] # seconds each item waited before this stage
+        self.processing_times = [] # seconds this stage spent on each item
+        self.thread = None
+
+class Pipeline(object):
+    # source is an iterable run in its own thread and stages is a list of
+    # [name, function] applied in turn to each item, each in its own thread -
+    # queue_size is the size of every queue, or a list of the sizes of the
+    # queues after the source and after each stage, 0 leaving a queue unbounded
+    def __init__(self, source, stages, queue_size=QUEUE_SIZE):
+        self.stopped = threading.Event()
+        self.source = source
+        if not isinstance(queue_size, list):
+            queue_size = [queue_size] * (len(stages) + 1)
+        self.stages = [PipelineStage("acquisition", None, queue_size[0])]
+        self.stages += [PipelineStage(name, function, size) for [name, function], size in zip(stages, queue_size[1:])]
+        self.latencies = [] # seconds from leaving the source to leaving the last stage
+
+    # yields the results of the last stage in order
+    def run(self):
+        self.stages[0].thread = threading.Thread(target=self.run_source)
+        for previous_stage, stage in zip(self.stages[:-1], self.stages[1:]):
+            stage.thread = threading.Thread(target=self.run_stage, args=(previous_stage, stage))
+        for stage in self.stages:
+            stage.thread.daemon = True
+            stage.thread.start()
+        try:
+            while True:
+                entry = self.get(self.stages[-1].output)
+                if entry is END_OF_ITEMS:
+                    break
+                if isinstance(entry, StageError):
+                    raise entry.exception
+                item, source_time, put_time = entry
+                self.latencies.append(timeit.default_timer() - source_time)
+                yield item
+        finally:
+            self.stop()
+
+    def stop(self):
+        self.stopped.set()
+        for stage in self.stages:
+            if stage.thread is not None:
+                stage.thread.join()
+
+    def run_source(self):
+        stage = self.stages[0]
+        try:
+            last_time = timeit.default_timer()
+            for item in self.source:
+                put_time = timeit.default_timer()
+                stage.processing_times.append(put_time - last_time)
+                self.put(stage, [item, put_time, put_time])
+                last_time = timeit.default_timer()
+                if self.stopped.is_set():
+                    return
+            self.put(stage, END_OF_ITEMS)
+        except Exception as exception:
+            traceback.print_exc()
+            self.put(stage, StageError(stage.name, exception))
+
+    def run_stage(self, previous_stage, stage):
+        while not self.stopped.is_set():
+            entry = self.get(previous_stage.output)
+            if (entry is END_OF_ITEMS) or isinstance(entry, StageError):
+                self.put(stage, entry)
+                return
+            item, source_time, put_time = entry
+            start_time = timeit.default_timer()
+            stage.waiting_times.append(start_time - put_time)
+            try:
+                item = stage.function(item)
+            except Exception as exception:
+                traceback.print_exc()
+                self.put(stage, StageError(stage.name, exception))
+                return
+            end_time = timeit.default_timer()
+            stage.processing_times.append(end_time - start_time)
+            self.put(stage, [item, source_time, end_time])
+
+    # waits for an entry, returning END_OF_ITEMS if the pipeline is stopped
+    def get(self, stage_queue):
+        while not self.stopped.is_set():
+            try:
+                return stage_queue.get(timeout=QUEUE_POLL_TIME)
+            except queue.Empty:
+                continue
+        return END_OF_ITEMS
+
+    def put(self, stage, entry):
+        while not self.stopped.is_set():
+            try:
+                stage.output.put(entry, timeout=QUEUE_POLL_TIME)
+                stage.queue_depths.append(stage.output.qsize())
+                return
+            except queue.Full:
+                continue
+
+    # current number of items waiting after each stage
+    def queue_depths(self):
+        return [[stage.name, stage.output.qsize()] for stage in self.stages]
+
+    # [name, mean queue depth, maximum queue depth, mean waiting time, mean
+    # processing time, maximum processing time] of each stage, times in seconds
+    def statistics(self):
+        return [[stage.name,
+                 mean_or_zero(stage.queue_depths), max(stage.queue_depths or [0]),
+                 mean_or_zero(stage.waiting_times),
+                 mean_or_zero(stage.processing_times), max(stage.processing_times or [0])]
+                for stage in self.stages]
+
+    def print_statistics(self):
+        print("| Stage        | Queue (mean) | Queue (max) | Wait (ms) | Work (ms) | Work max (ms) |")
+        for name, mean_depth, max_depth, waiting_time, processing_time, max_processing_time in self.statistics():
+            print("| %-12s | %12.2f | %11d | %9.1f | %9.1f | %13.1f |" % (name, mean_depth, max_depth, 1000 * waiting_time, 1000 * processing_time, 1000 * max_processing_time))
+        print("Latency from acquisition to output: %.1f ms mean, %.1f ms max" % (1000 * mean_or_zero(self.latencies), 1000 * max(self.latencies or [0])))
+
+def mean_or_zero(values):
+    if len(values) == 0:
+        return 0.
+    return np.mean(values)
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+#coding=utf-8
+# Prebuilt library of dimensionless Young--Laplace profiles on a dense Bond
+# number grid.  The library is built once with
+#
+#     python modules/profile_library.py build
+#
+# and is memory-mapped when loaded, so that several OpenDrop processes share
+# the same pages instead of each holding a copy.
+from __future__ import print_function
+from de_YoungLaplace import ylderiv, ylderiv2
+from interpolation_function import cubic_interpolation_function
+from scipy.integrate import odeint
+
+import argparse
+import json
+import os
+import warnings
+import numpy as np
+
+LIBRARY_VERSION = 2 # 2: second-order Bond sensitivities stored
+LIBRARY_DIRECTORY = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'data', 'profile_library')
+PROFILES_FILENAME = 'profiles.npy'
+METADATA_FILENAME = 'metadata.json'
+
+BOND_MIN = 0.0
+BOND_MAX = 0.8
+BOND_POINTS = 401
+S_MAX = 6.0
+S_POINTS = 1200
+INTERPOLATION_TOL = 1.e-5 # largest error of the interpolated profile and sensitivities, relative to values above 1
+
+class ProfileLibrary(object):
+    def __init__(self, profiles, bond_min, bond_max, s_max, valid_s):
+        self.profiles = profiles # (bond points, s points + 1, 9) array of the profile, its Bond sensitivities and their Bond derivatives, usually memory-mapped
+        self.valid_s = valid_s # largest arc length of each interval between grid Bond numbers where the interpolation is accurate
+        self.bond_min = bond_min
+        self.bond_max = bond_max
+        self.s_max = s_max
+        self.Delta_bond = (bond_max - bond_min) / (profiles.shape[0] - 1)
+        self.Delta_s = s_max / (profiles.shape[1] - 1)
+
+    # tests whether the library can provide a profile for these values
+    def covers(self, bond_number, max_s):
+        if not (self.bond_min <= bond_number <= self.bond_max):
+            return False
+        m1 = min(int((bond_number - self.bond_min) / self.Delta_bond), self.profiles.shape[0] - 2)
+        return max_s <= self.valid_s[m1]
+
+    # returns the profile at s = linspace(0, max_s, s_points + 1) for bond_number,
+    # interpolated in Bond number with the stored Bond sensitivities and then in
+    # arc length with the Young--Laplace derivatives (as in DropData.profile)
+    def profile_data(self, bond_number, max_s, s_points):
+        s_data_points = np.linspace(0, max_s, s_points + 1)
+        n1 = np.minimum((s_data_points / self.Delta_s).astype(int), self.profiles.shape[1] - 2)
+        t = s_data_points / self.Delta_s - n1
+        vec1 = self.at_bond(bond_number, n1)
+        vec2 = self.at_bond(bond_number, n1 + 1)
+        Dvec1 = np.array(ylderiv(vec1.T, 0, bond_number)).T
+        Dvec2 = np.array(ylderiv(vec2.T, 0, bond_number)).T
+        return cubic_interpolation_function(vec1, vec2, Dvec1, Dvec2, self.Delta_s, t[:, None])
+
+    # interpolates the stored profiles and their Bond sensitivities to
+    # bond_number at the arc length nodes s_indices
+    def at_bond(self, bond_number, s_indices):
+        m1 = min(int((bond_number - self.bond_min) / self.Delta_bond), self.profiles.shape[0] - 2)
+        u = (bond_number - self.bond_min) / self.Delta_bond - m1
+        vec1 = self.profiles[m1][s_indices]
+        vec2 = self.profiles[m1 + 1][s_indices]
+        # x, y and phi use their Bond sensitivities as derivatives, and the
+        # sensitivities the second-order ones
+        return cubic_interpolation_function(vec1[:, :6], vec2[:, :6], vec1[:, 3:], vec2[:, 3:], self.Delta_bond, u)
+
+# integrates the profiles for the whole Bond number grid and saves the library,
+# with the arc length up to which each interval between grid Bond numbers is
+# accurate at its midpoint - near closure (x -> 0) the Bond sensitivities grow
+# without bound, and there profiles are left to odeint
+def build_profile_library(directory=LIBRARY_DIRECTORY, bond_min=BOND_MIN, bond_max=BOND_MAX, bond_points=BOND_POINTS, s_max=S_MAX, s_points=S_POINTS):
+    s_data_points = np.linspace(0, s_max, s_points + 1)
+    bond_numbers = np.linspace(bond_min, bond_max, bond_points)
+    x_vec_initial = [.000001, 0., 0., 0., 0., 0., 0., 0., 0.]
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    profiles = np.lib.format.open_memmap(os.path.join(directory, PROFILES_FILENAME), mode='w+', dtype=np.float64, shape=(bond_points, s_points + 1, 9))
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore') # profiles that close within s_max are truncated below
+        for i, bond_number in enumerate(bond_numbers):
+            profiles[i] = odeint(ylderiv2, x_vec_initial, s_data_points, args=(bond_number,))
+        valid_s = []
+        for i in range(bond_points - 1):
+            midpoint = odeint(ylderiv, x_vec_initial[:6], s_data_points, args=((bond_numbers[i] + bond_numbers[i + 1]) / 2,))
+            interpolated = cubic_interpolation_function(profiles[i][:, :6], profiles[i + 1][:, :6], profiles[i][:, 3:], profiles[i + 1][:, 3:], bond_numbers[i + 1] - bond_numbers[i], 0.5)
+            # usable up to the node before a profile closes (x <= 0), the
+            # integration fails or the interpolation is inaccurate
+            invalid = ~np.isfinite(profiles[i]).all(axis=1) | ~np.isfinite(profiles[i + 1]).all(axis=1) | ~np.isfinite(midpoint).all(axis=1)
+            invalid |= (profiles[i][:, 0] <= 0) | (profiles[i + 1][:, 0] <= 0) | (midpoint[:, 0] <= 0)
+            with np.errstate(invalid='ignore'):
+                invalid |= (np.abs(interpolated - midpoint) > INTERPOLATION_TOL * np.maximum(np.abs(midpoint), 1)).any(axis=1)
+            invalid[0] = False
+            if invalid.any():
+                valid_s.append(float(s_data_points[max(np.argmax(invalid) - 2, 0)]))
+            else:
+                valid_s.append(float(s_max))
+    profiles.flush()
+    del profiles
+    metadata = {
+        'version': LIBRARY_VERSION,
+        'bond_min': bond_min,
+        'bond_max': bond_max,
+        'bond_points': bond_points,
+        's_max': s_max,
+        's_points': s_points,
+        'valid_s': valid_s,
+    }
+    with open(os.path.join(directory, METADATA_FILENAME), 'w') as f:
+        json.dump(metadata, f, indent=4)
+    return metadata
+
+# memory-maps the profile library - returns None if there is no usable library
+def load_profile_library(directory=LIBRARY_DIRECTORY):
+    metadata_filename = os.path.join(directory, METADATA_FILENAME)
+    if not os.path.exists(metadata_filename):
+        return None
+    with open(metadata_filename, 'r') as f:
+        metadata = json.load(f)
+    if metadata.get('version') != LIBRARY_VERSION:
+        print("WARNING: profile library version %s does not match %d, rebuild with 'python modules/profile_library.py build'" % (metadata.get('version'), LIBRARY_VERSION))
+        return None
+    profiles = np.load(os.path.join(directory, PROFILES_FILENAME), mmap_mode='r')
+    return ProfileLibrary(profiles, metadata['bond_min'], metadata['bond_max'], metadata['s_max'], metadata['valid_s'])
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect the OpenDrop profile library")
+    parser.add_argument('command', choices=['build', 'info'])
+    parser.add_argument('--directory', default=LIBRARY_DIRECTORY)
+    parser.add_argument('--bond-min', type=float, default=BOND_MIN)
+    parser.add_argument('--bond-max', type=float, default=BOND_MAX)
+    parser.add_argument('--bond-points', type=int, default=BOND_POINTS)
+    parser.add_argument('--s-max', type=float, default=S_MAX)
+    parser.add_argument('--s-points', type=int, default=S_POINTS)
+    args = parser.parse_args()
+    if args.command == 'build':
+        metadata = build_profile_library(args.directory, args.bond_min, args.bond_max, args.bond_points, args.s_max, args.s_points)
+        print("Built profile library version %d in %s" % (metadata['version'], os.path.realpath(args.directory)))
+    else:
+        library = load_profile_library(args.directory)
+        if library is None:
+            print("No usable profile library in %s" % os.path.realpath(args.directory))
+        else:
+            print("Profile library version %d: Bond %g to %g (%d points), s up to %g (%d points)" %
+                (LIBRARY_VERSION, library.bond_min, library.bond_max, library.profiles.shape[0], library.s_max, library.profiles.shape[1] - 1))
+
+if __name__ == '__main__':
+    main()
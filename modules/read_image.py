@@ -1,7 +1,8 @@
 #!/usr/bin/env python
 #coding=utf-8
 from __future__ import print_function
-import subprocess
+import shlex
+from distutils.spawn import find_executable
 import cv2
 import time
 import datetime
@@ -9,7 +10,15 @@ import timeit
 import os
 import numpy as np
 
-IMAGE_FLAG = 1 # 1 returns three channels (BGR), 0 returns gray
+from CaptureSession import CaptureSession
+from FleaGrabber import StreamingGrabber, PerFrameGrabber
+from VideoSource import VideoSource
+from DirectoryWatcher import DirectoryWatcher
+from ImageSaver import ImageSaver, region_union
+
+IMAGE_FLAG = 0 # 0 returns gray, which is all the analysis uses, 1 returns three channels (BGR)
+FLEA3_GRABBER_COMMAND = "./FCGrabStream" # streaming grabber, unless experimental_setup.grabber_command is set
+FLEA3_FRAME_GRABBER_COMMAND = ["./FCGrab"] # run per frame if the streaming grabber is missing
 
 
 def get_image(experimental_drop, experimental_setup, frame_number):
@@ -29,73 +38,173 @@ def get_image(experimental_drop, experimental_setup, frame_number):
     if (frame_number >= 0) and (experimental_setup.save_images_boole):
         save_image(experimental_drop, experimental_setup, frame_number)
 
+# queues the image to be written by the image saver kept on experimental_setup
 def save_image(experimental_drop, experimental_setup, frame_number):
     filename_temp = os.path.join(experimental_setup.directory_string, experimental_setup.filename) # gets the filename for the file to be saved
     time_string = experimental_setup.time_string # imports the time_string from the initial experiment
     filename = filename_temp[:-4] + '_' + time_string + '_' + str(frame_number).zfill(3) + filename_temp[-4:]
-    cv2.imwrite(filename, experimental_drop.image)
+    if experimental_setup.image_saver is None:
+        experimental_setup.image_saver = open_image_saver(experimental_setup)
+    experimental_setup.image_saver.save(experimental_drop.image, filename)
+
+# starts a background image saver with the saving options of experimental_setup
+def open_image_saver(experimental_setup):
+    region = None
+    if experimental_setup.save_roi_only:
+        region = region_union(experimental_setup.drop_region, experimental_setup.needle_region)
+    archive_filename = None
+    if experimental_setup.save_archive:
+        filename_temp = os.path.join(experimental_setup.directory_string, experimental_setup.filename)
+        archive_filename = filename_temp[:-4] + '_' + experimental_setup.time_string + '.zip'
+    return ImageSaver(region, experimental_setup.save_grayscale, archive_filename)
+
+# writes the images still queued, if images were saved
+def close_image_saver(experimental_setup):
+    if experimental_setup.image_saver is not None:
+        experimental_setup.image_saver.close()
+        experimental_setup.image_saver = None
 
 # this routine imports the raw drop image based on user input image source
 # image_source = 0 : Flea3
 # image_source = 1 : USB camera
 # image_source = 2 : image on computer
+# image_source = 3 : video file or numbered image sequence
+# image_source = 4 : images written into a watched directory
 def import_from_source(experimental_drop, experimental_setup, frame_number):
     image_source = experimental_setup.image_source
     # from Flea3 camera
     if image_source == "Flea3":
-        image_from_Flea3(experimental_drop)
+        image_from_Flea3(experimental_drop, experimental_setup)
     # from USB camera
     elif image_source == "USB camera":
-        image_from_camera(experimental_drop)
+        image_from_camera(experimental_drop, experimental_setup)
     # from specified file
     elif image_source == "Local images":
         image_from_harddrive(experimental_drop, experimental_setup, frame_number)
+    # from a video file or numbered image sequence
+    elif image_source == "Video file":
+        image_from_video(experimental_drop, experimental_setup, frame_number)
+    # from images landing in a directory
+    elif image_source == "Watched directory":
+        image_from_directory(experimental_drop, experimental_setup, frame_number)
     # else the value of img_src is incorrect
     else:
         ValueError("Incorrect value for image_source")
     # experimental_drop.time = datetime.datetime.now().strftime("%Y-%m-%d-%H%M%S")
-    experimental_drop.time = timeit.default_timer()
+    if experimental_drop.time is None: # sources without their own timestamps
+        experimental_drop.time = timeit.default_timer()
     # experimental_drop.image = np.flipud(cv2.imread(experimental_drop.filename, IMAGE_FLAG))
 
 
-def image_from_Flea3(experimental_drop):
-    subprocess.call(["./FCGrab"])
-    temp_filename = 'FCG.pgm'
-    experimental_drop.image = cv2.imread(temp_filename, IMAGE_FLAG)
-    os.remove(temp_filename)
-    # experimental_drop.filename
-
+# takes the image from the grabber kept on experimental_setup, starting it on
+# first use - the streaming grabber experimental_setup.grabber_command, or
+# FCGrab run per frame if there is no streaming grabber
+def image_from_Flea3(experimental_drop, experimental_setup):
+    if experimental_setup.capture_session is None:
+        experimental_setup.capture_session = open_flea3_grabber(experimental_setup)
+    image, experimental_drop.time = experimental_setup.capture_session.read()
+    if image.dtype != np.uint8:
+        image = (image >> 8).astype(np.uint8) # as cv2.imread reads 16-bit images
+    if image_flag(experimental_setup) == 1:
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    experimental_drop.image = image
+
+# starts the streaming grabber, warning if it is missing and FCGrab has to
+# initialise the camera for every frame instead
+def open_flea3_grabber(experimental_setup):
+    command = shlex.split(experimental_setup.grabber_command or FLEA3_GRABBER_COMMAND)
+    if command and (os.path.isfile(command[0]) or find_executable(command[0])):
+        print("Starting grabber...")
+        return StreamingGrabber(command)
+    print("Warning: streaming grabber %s not found, running %s for every frame" % (command[0] if command else "(none)", FLEA3_FRAME_GRABBER_COMMAND[0]))
+    return PerFrameGrabber(FLEA3_FRAME_GRABBER_COMMAND)
+
+# reads a local image - the initialisation frame (-1), only used to select
+# the regions, at the reduced size experimental_setup.preview_reduction
 def image_from_harddrive(experimental_drop, experimental_setup, frame_number):
     import_filename = get_import_filename(experimental_setup, frame_number)
-    experimental_drop.image = cv2.imread(import_filename, IMAGE_FLAG)
+    if frame_number < 0:
+        experimental_drop.image_reduction = experimental_setup.preview_reduction
+    experimental_drop.image = read_image_file(import_filename, image_flag(experimental_setup), experimental_drop.image_reduction)
+
+# cv2.imread at 1/reduction of the full size (reduction 1, 2, 4 or 8) - JPEG
+# images are then decoded at the reduced size directly
+def read_image_file(filename, flag, reduction=1):
+    if reduction == 1:
+        return cv2.imread(filename, flag)
+    reduced_flag_name = "IMREAD_REDUCED_%s_%d" % ("GRAYSCALE" if flag == 0 else "COLOR", reduction)
+    if hasattr(cv2, reduced_flag_name):
+        return cv2.imread(filename, getattr(cv2, reduced_flag_name))
+    image = cv2.imread(filename, flag) # OpenCV before 3.2
+    return cv2.resize(image, (0,0), fx=1./reduction, fy=1./reduction, interpolation=cv2.INTER_AREA)
+
+# cv2.imread flag for the frames - gray, unless colour copies of the frames
+# are saved
+def image_flag(experimental_setup):
+    if experimental_setup.save_images_boole and not experimental_setup.save_grayscale:
+        return 1
+    return IMAGE_FLAG
 
 def get_import_filename(experimental_setup, frame_number):
     return experimental_setup.import_files[frame_number*(frame_number>0)] # handles initialisation frame = -1
 
-# Captures a single image from the camera and returns it in IplImage format
-def image_from_camera(experimental_drop):
-    grabanimage()    
-    temp_filename = 'USBtemp.png'
-    experimental_drop.image = cv2.imread(temp_filename, IMAGE_FLAG)
-
-def grabanimage():
-    camera_port = 0
-    ramp_frames = 40
-    camera = cv2.VideoCapture(camera_port)
-
-    def get_image():
-        retval, im = camera.read()
-        return im
-
-    for i in xrange(ramp_frames):
-        temp = get_image()
-    print("Taking image...")
-# Take the actual image we want to keep
-    camera_capture = get_image()
-    file = "USBtemp.png"
-# A nice feature of the imwrite method is that it will automatically choose the
-# correct format based on the file extension you provide. Convenient!
-    cv2.imwrite(file, camera_capture)
-
-
+# opens the video or numbered image sequence experimental_setup.video_filename
+# as its capture session, limiting number_of_frames to the frames available -
+# reading past the last frame raises NoMoreImages, as the count is an estimate
+def open_video_source(experimental_setup):
+    experimental_setup.capture_session = VideoSource(
+        experimental_setup.video_filename,
+        experimental_setup.video_stride,
+        experimental_setup.video_start_time,
+        experimental_setup.video_end_time,
+        experimental_setup.video_fps,
+        image_flag(experimental_setup))
+    n_available = experimental_setup.capture_session.number_of_frames
+    if experimental_setup.number_of_frames:
+        experimental_setup.number_of_frames = min(experimental_setup.number_of_frames, n_available)
+    else:
+        experimental_setup.number_of_frames = n_available
 
+# takes the next frame of the video source - the initialisation frame (-1) is
+# the first frame, which is then analysed as frame 0
+def image_from_video(experimental_drop, experimental_setup, frame_number):
+    if frame_number < 0:
+        experimental_drop.image, experimental_drop.time = experimental_setup.capture_session.peek()
+    else:
+        experimental_drop.image, experimental_drop.time = experimental_setup.capture_session.read()
+
+# takes the next image completed in experimental_setup.watch_directory,
+# starting to watch on first use - the initialisation frame (-1) is the first
+# image, which is then analysed as frame 0. Raises NoMoreImages once no image
+# arrives within experimental_setup.watch_timeout.
+def image_from_directory(experimental_drop, experimental_setup, frame_number):
+    if experimental_setup.capture_session is None:
+        print("Watching %s for %s..." % (experimental_setup.watch_directory, experimental_setup.watch_pattern))
+        experimental_setup.capture_session = DirectoryWatcher(
+            experimental_setup.watch_directory,
+            experimental_setup.watch_pattern,
+            experimental_setup.watch_order,
+            experimental_setup.watch_existing,
+            experimental_setup.watch_timeout,
+            image_flag(experimental_setup))
+    if frame_number < 0:
+        experimental_drop.image, experimental_drop.time = experimental_setup.capture_session.peek()
+    else:
+        experimental_drop.image, experimental_drop.time = experimental_setup.capture_session.read()
+
+# Captures a single image from the camera session kept on experimental_setup,
+# opening the session on first use
+def image_from_camera(experimental_drop, experimental_setup):
+    if experimental_setup.capture_session is None:
+        print("Opening camera...")
+        experimental_setup.capture_session = CaptureSession()
+    image, experimental_drop.time = experimental_setup.capture_session.read()
+    if image_flag(experimental_setup) == 0:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    experimental_drop.image = image
+
+# releases the camera or video, if a capture session was opened
+def close_capture_session(experimental_setup):
+    if experimental_setup.capture_session is not None:
+        experimental_setup.capture_session.close()
+        experimental_setup.capture_session = None
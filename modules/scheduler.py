@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+#coding=utf-8
+from __future__ import print_function
+import copy
+import time
+import timeit
+
+# what to do when the analysis cannot keep up with the frame interval
+OVERLOAD_POLICIES = ["drop", "backlog", "degrade"]
+DEGRADE_BACKLOG = 2 # frames waiting to be fitted before the fast fit is used
+DEGRADED_FITTING_STEPS = 3
+DEGRADED_DELTA_TOL = 1.e-4
+
+# Captures frame i at start + i * wait_time, so that the cadence does not
+# drift with the time taken by each frame. A frame captured after its
+# deadline counts as a missed deadline. With the "drop" policy, frames whose
+# slot has already passed when the previous capture finishes are skipped,
+# while "backlog" and "degrade" capture every frame and let the fitting fall
+# behind ("degrade" then fits faster while the backlog is long).
+class FrameScheduler(object):
+    def __init__(self, wait_time, policy="backlog", degrade_backlog=DEGRADE_BACKLOG):
+        if policy not in OVERLOAD_POLICIES:
+            raise ValueError("Overload policy must be one of " + ", ".join(OVERLOAD_POLICIES))
+        self.wait_time = wait_time
+        self.policy = policy
+        self.degrade_backlog = degrade_backlog
+        self.start_time = None
+        self.missed_deadlines = 0
+        self.dropped_frames = 0
+        self.frames_acquired = 0
+        self.frames_fitted = 0
+
+    # yields the numbers of the frames to capture out of n_frames, returning
+    # at the deadline of each frame - without end if n_frames is None
+    def frames(self, n_frames):
+        self.start_time = timeit.default_timer()
+        i = 0
+        while (n_frames is None) or (i < n_frames):
+            deadline = self.deadline(i)
+            now = timeit.default_timer()
+            if self.wait_time <= 0:
+                pass # as fast as possible, nothing can be late
+            elif now < deadline:
+                time.sleep(deadline - now)
+            elif (now > deadline + self.wait_time) and (self.policy == "drop"):
+                skipped = int((now - deadline) / self.wait_time)
+                if n_frames is not None:
+                    skipped = min(skipped, n_frames - i)
+                self.dropped_frames += skipped
+                self.missed_deadlines += skipped
+                print("WARNING: dropped %d frames to keep to the frame interval" % skipped)
+                i += skipped
+                continue
+            elif now > deadline + 0.5 * self.wait_time:
+                self.missed_deadlines += 1
+                print("WARNING: frame %d captured %.2f s late" % (i+1, now - deadline))
+            self.frames_acquired += 1 # counted before the frame is handed out, so it is never fitted uncounted
+            yield i
+            i += 1
+
+    def deadline(self, i):
+        return self.start_time + i * self.wait_time
+
+    # frames captured but not yet fitted
+    def backlog(self):
+        return self.frames_acquired - self.frames_fitted
+
+    # tolerances for fitting the next frame - looser ones under the "degrade"
+    # policy while the backlog is long
+    def fitting_tolerances(self, tolerances):
+        if (self.policy != "degrade") or (self.backlog() <= self.degrade_backlog):
+            return tolerances
+        degraded_tolerances = copy.copy(tolerances)
+        degraded_tolerances.MAXIMUM_FITTING_STEPS = min(tolerances.MAXIMUM_FITTING_STEPS, DEGRADED_FITTING_STEPS)
+        degraded_tolerances.DELTA_TOL = max(tolerances.DELTA_TOL, DEGRADED_DELTA_TOL)
+        return degraded_tolerances
+
+    def frame_fitted(self):
+        self.frames_fitted += 1
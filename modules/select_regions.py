@@ -15,13 +15,20 @@ import sys
 MAX_IMAGE_TO_SCREEN_RATIO = 0.8
 
 def set_regions(experimental_drop, experimental_setup):
-    # select the drop and needle regions in the image
+    # select the drop and needle regions in the image - regions are returned
+    # in pixels of the full frame, also for an image decoded at reduced size
     screen_size = experimental_setup.screen_resolution
-    image_size = experimental_drop.image.shape
+    reduction = experimental_drop.image_reduction
+    image_size = [reduction * size for size in experimental_drop.image.shape[:2]]
     scale = set_scale(image_size, screen_size)
     screen_position = set_screen_position(screen_size)
-    experimental_setup.drop_region = user_ROI(experimental_drop.image, 'Select drop region', scale, screen_position)
-    experimental_setup.needle_region = user_ROI(experimental_drop.image, 'Select needle region', scale, screen_position)
+    drop_region = user_ROI(experimental_drop.image, 'Select drop region', scale * reduction, screen_position)
+    needle_region = user_ROI(experimental_drop.image, 'Select needle region', scale * reduction, screen_position)
+    experimental_setup.drop_region = scale_region(drop_region, reduction)
+    experimental_setup.needle_region = scale_region(needle_region, reduction)
+
+def scale_region(region, factor):
+    return [(x * factor, y * factor) for x, y in region]
 
 def set_scale(image_size, screen_size):
     x_ratio = image_size[1]/float(screen_size[0])
@@ -59,6 +66,8 @@ def user_ROI(raw_image, title,  scale, screen_position): #, line_colour=(0, 0, 2
     cv2.setMouseCallback(title, draw_rectangle)
 
     image_TEMP = cv2.resize(raw_image, (0,0), fx=scale, fy=scale)
+    if len(image_TEMP.shape) == 2:
+        image_TEMP = cv2.cvtColor(image_TEMP, cv2.COLOR_GRAY2BGR) # so that the selection is drawn in colour
 
     img = image_TEMP.copy()
 
@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+#coding=utf-8
+# Least-squares solvers for the drop fit (see fit_data.FitProblem). A solver
+# is called as solver(problem, params) and returns the fitted parameters,
+# driving the fit through the problem's callbacks:
+#   problem.evaluate(params) -> [jacobian, residuals], an iterate of the solver
+#   problem.objective(params) -> sum of squared residuals, e.g. of a trial step
+#   problem.residuals(params) -> residuals, e.g. of a trial step
+#   problem.step_taken(params, delta, v, S) -> False once the fit has converged,
+#       called after each step with the new parameters, the step and the
+#       gradient J^T e and objective S of the last iterate
+from __future__ import print_function
+import numpy as np
+import scipy.optimize
+from scipy.linalg import solve_triangular
+
+dot = np.dot
+
+RHO = 0.25 # LMF: increase lambda if the reduction is below this ratio of the predicted one
+SIGMA = 0.75 # LMF: decrease lambda if the reduction is above this ratio of the predicted one
+LINE_SEARCH_STEPS = 10 # Gauss--Newton: step halvings before giving up on a direction
+ARMIJO = 1.e-4 # Gauss--Newton: fraction of the predicted decrease a step must achieve
+REDUCTION_TOL = 1.e-6 # Gauss--Newton and dogleg: converged once a Gauss--Newton step predicts a smaller relative reduction of the objective
+REGISTRATION_STEPS = 10 # variable projection: Gauss--Newton steps of the registration at each Bond number
+BOND = 3 # index of the Bond number in the parameters
+TRUST_RADIUS_SHRINK = 0.25 # dogleg: ratio below which the trust region is reduced
+TRUST_RADIUS_GROW = 0.75 # dogleg: ratio above which the trust region is enlarged
+TRUST_RADIUS_REDUCTION = 0.25 # dogleg: factor of the step length by which the trust region is reduced
+TRUST_RADIUS_EXPANSION = 2. # dogleg: factor by which the trust region is enlarged
+
+# raised by the least_squares callbacks to stop scipy once the fit converged
+class StopFit(Exception):
+    pass
+
+# builds the normal matrix A = J^T J, the gradient vector v = J^T e and the
+# objective S = e^T e
+def normal_equations(jacobian, residuals):
+    A = dot(jacobian.T, jacobian)
+    v = dot(jacobian.T, residuals).reshape(-1, 1)
+    S = dot(residuals, residuals)
+    return [A, v, S]
+
+# implements the Levenberg--Marquardt--Fletcher algorithm to find parameters
+# Levenberg--Marquardt--Fletcher Automated Optimisation
+def lmf(problem, params):
+    lmbda = 0 # initialise value of lambda
+    first_step = True
+    loop = True
+    while(loop):
+        jacobian, residuals = problem.evaluate(params)
+        A, v, Snew = normal_equations(jacobian, residuals)
+        if lmbda != 0:
+            A_plus_lambdaI = A + lmbda * np.diag(np.diag(A))
+        else:
+            A_plus_lambdaI = A
+        inv = inverse_matrix(A_plus_lambdaI)
+        delta = -dot(inv, v).T
+        if first_step: # initialisation step
+            params = params + (delta)[0]
+            Sold = Snew # initialisation step
+            first_step = False
+        else:
+            R = (Sold - Snew) / (dot(delta, (-2 * v - dot(A.T, delta.T))))
+            if R < RHO:
+                nu = bounded_2_to_10( 2 - (Snew - Sold)/(dot(delta, v)) )
+                if lmbda == 0:
+                    lmbdaC = 1/max([abs(inv[i][i]) for i in range(0, len(inv))])
+                    lmbda = lmbdaC # calculate lambda_c and set lambda
+                    nu = nu / 2
+                lmbda = nu * lmbda # rescale lambda
+            if R > SIGMA:
+                if lmbda != 0:
+                    lmbda = lmbda / 2
+                    if lmbda < lmbdaC:
+                        lmbda = 0
+            deltaS = Snew - Sold # calculate reduction in objective function
+            if deltaS < 0:
+                params = params + (delta)[0] # if objective reduces accept
+                Sold = Snew
+        loop = problem.step_taken(params, delta[0], v, Snew)
+    return params
+
+# ensure nu is between 2 and 10
+def bounded_2_to_10(nu):
+    if nu < 2:
+        nu = 2  # rescale nu if too small
+    elif nu > 10:
+        nu = 10 # rescale nu if too large
+    return nu
+
+def inverse_matrix(matrix):
+    # check if matrix is singular via
+    # condition_number = np.linalg.cond(matrix)
+    return np.linalg.inv(matrix)
+
+# Gauss--Newton steps from a QR factorisation of the Jacobian, halved until
+# the objective decreases by at least ARMIJO of the predicted decrease
+def gauss_newton(problem, params):
+    loop = True
+    while(loop):
+        jacobian, residuals = problem.evaluate(params)
+        A, v, S = normal_equations(jacobian, residuals)
+        delta = gauss_newton_step(jacobian, residuals)
+        if reduction_converged(jacobian, delta, S):
+            params = params + delta
+            problem.step_taken(params, delta, v, S)
+            return params
+        slope = 2 * dot(v[:, 0], delta) # derivative of S along delta
+        step = 1.
+        for attempt in range(LINE_SEARCH_STEPS):
+            if problem.objective(params + step * delta) <= S + ARMIJO * step * slope:
+                break
+            step = step / 2
+        else:
+            print("No reduction along the Gauss--Newton step")
+            step = 0.
+        params = params + step * delta
+        loop = problem.step_taken(params, step * delta, v, S) and (step > 0)
+    return params
+
+# whether the Gauss--Newton step delta, which reduces the objective S of the
+# linearised problem by |J delta|^2, can no longer reduce S measurably -
+# below that the objective only changes with the tolerance of the
+# closest-point search, so line searches and trust regions wander
+def reduction_converged(jacobian, delta, S):
+    if np.sum(dot(jacobian, delta)**2) < REDUCTION_TOL * S:
+        print("Convergence in predicted reduction")
+        return True
+    return False
+
+# the step minimising |J delta + e| - the Jacobian is well conditioned enough
+# for QR, but rank deficient Jacobians fall back to a least-squares solve
+def gauss_newton_step(jacobian, residuals):
+    try:
+        q, r = np.linalg.qr(jacobian)
+        return -solve_triangular(r, dot(q.T, residuals))
+    except np.linalg.LinAlgError:
+        return -np.linalg.lstsq(jacobian, residuals, rcond=None)[0]
+
+# Powell's dogleg trust region method, in parameters scaled by the norms of
+# the Jacobian columns so that the trust region suits pixel lengths, the
+# Bond number and the rotation alike
+def dogleg(problem, params):
+    radius = None # trust region radius in scaled parameters
+    jacobian, residuals = problem.evaluate(params)
+    loop = True
+    while(loop):
+        A, v, S = normal_equations(jacobian, residuals)
+        g = v[:, 0]
+        scale = np.sqrt(np.diag(A))
+        scale[scale == 0] = 1.
+        delta_gn = gauss_newton_step(jacobian, residuals)
+        if reduction_converged(jacobian, delta_gn, S):
+            params = params + delta_gn
+            problem.step_taken(params, delta_gn, v, S)
+            return params
+        if radius is None:
+            radius = np.linalg.norm(scale * delta_gn) # the first step is a full Gauss--Newton step
+        delta = dogleg_step(delta_gn, g, A, scale, radius)
+        predicted = -(2 * dot(g, delta) + dot(delta, dot(A, delta)))
+        actual = S - problem.objective(params + delta)
+        ratio = actual / predicted if predicted > 0 else -1.
+        if ratio < TRUST_RADIUS_SHRINK:
+            radius = TRUST_RADIUS_REDUCTION * np.linalg.norm(scale * delta)
+        elif (ratio > TRUST_RADIUS_GROW) and (np.linalg.norm(scale * delta) > 0.99 * radius):
+            radius = TRUST_RADIUS_EXPANSION * radius
+        if ratio > 0: # accept
+            params = params + delta
+            jacobian, residuals = problem.evaluate(params)
+        loop = problem.step_taken(params, delta, v, S)
+    return params
+
+# the dogleg step of the quadratic model with Hessian A and gradient 2g
+# within radius of scaled parameters
+def dogleg_step(delta_gn, g, A, scale, radius):
+    z_gn = scale * delta_gn
+    if np.linalg.norm(z_gn) <= radius:
+        return delta_gn
+    g_z = g / scale
+    A_z = A / np.outer(scale, scale)
+    z_sd = -dot(g_z, g_z) / dot(g_z, dot(A_z, g_z)) * g_z # minimum along steepest descent
+    if np.linalg.norm(z_sd) >= radius:
+        return radius * z_sd / np.linalg.norm(z_sd) / scale
+    d = z_gn - z_sd # from the Cauchy point towards the Gauss--Newton step
+    a = dot(d, d)
+    b = 2 * dot(z_sd, d)
+    c = dot(z_sd, z_sd) - radius**2
+    tau = (-b + np.sqrt(b**2 - 4 * a * c)) / (2 * a)
+    return (z_sd + tau * d) / scale
+
+# Variable projection: the apex position, radius and rotation only place the
+# dimensionless profile of a Bond number on the image, so each step first
+# registers the profile onto the contour at a fixed Bond number - which needs
+# no new profile, only closest-point searches - and then takes a Gauss--Newton
+# step in the Bond number alone from its sensitivity column of the Jacobian
+# (see de_YoungLaplace.ylderiv), halved until the registered objective
+# decreases. Each new Bond number, and so each integration of the profile,
+# is a step of the fit.
+def variable_projection(problem, params):
+    params, jacobian, residuals = register(problem, params)
+    loop = True
+    while(loop):
+        A, v, S = normal_equations(jacobian, residuals)
+        delta = gauss_newton_step(jacobian, residuals) # its Bond component is that of the reduced problem
+        if reduction_converged(jacobian, delta, S):
+            params = params + delta
+            problem.step_taken(params, delta, v, S)
+            return params
+        step = 1.
+        for attempt in range(LINE_SEARCH_STEPS):
+            trial_params, trial_jacobian, trial_residuals = register(problem, params + step * delta)
+            if dot(trial_residuals, trial_residuals) < S:
+                break
+            step = step / 2
+        else:
+            print("No reduction along the Gauss--Newton step")
+            problem.step_taken(params, 0 * delta, v, S)
+            return params
+        loop = problem.step_taken(trial_params, trial_params - params, v, S)
+        params, jacobian, residuals = trial_params, trial_jacobian, trial_residuals
+    return params
+
+# fits the apex position, radius and rotation of params with the Bond number
+# fixed, returning [params, jacobian, residuals] at the registered parameters
+def register(problem, params):
+    geometric = [i for i in range(len(params)) if i != BOND]
+    params = np.array(params, dtype=float)
+    for registration_step in range(REGISTRATION_STEPS):
+        jacobian, residuals = problem.evaluate(params)
+        delta = gauss_newton_step(jacobian[:, geometric], residuals)
+        if np.sum(dot(jacobian[:, geometric], delta)**2) < REDUCTION_TOL * dot(residuals, residuals):
+            break
+        params[geometric] += delta
+    return [params, jacobian, residuals]
+
+# scipy.optimize.least_squares (trust region reflective, Jacobian columns
+# scaled) with the analytic Jacobian - scipy's own tolerances are set to
+# machine precision so the fit stops on the same tests as the other solvers
+def least_squares(problem, params):
+    eps = np.finfo(float).eps
+    iterates = [] # [params, v, S] of the iterates, at which scipy asks for the Jacobian
+    def jacobian(p):
+        jacobian, residuals = problem.evaluate(p)
+        A, v, S = normal_equations(jacobian, residuals)
+        iterates.append([np.array(p), v, S])
+        if len(iterates) > 1:
+            last_params, last_v, last_S = iterates[-2]
+            if not problem.step_taken(p, p - last_params, last_v, last_S):
+                raise StopFit()
+        return jacobian
+    try:
+        params = scipy.optimize.least_squares(problem.residuals, params, jac=jacobian, method='trf', x_scale='jac', ftol=eps, xtol=eps, gtol=eps).x
+    except StopFit:
+        return iterates[-1][0]
+    last_params, last_v, last_S = iterates[-1]
+    if np.any(params != last_params):
+        problem.evaluate(params)
+        problem.step_taken(params, params - last_params, last_v, last_S)
+    return params
+
+SOLVERS = {
+    "lmf": lmf,
+    "gauss_newton": gauss_newton,
+    "dogleg": dogleg,
+    "least_squares": least_squares,
+    "variable_projection": variable_projection,
+}
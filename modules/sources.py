@@ -0,0 +1,9 @@
+#!/usr/bin/env python
+#coding=utf-8
+from __future__ import print_function
+
+# raised by the image sources once no more images will arrive: at the end of
+# a video or image sequence, when no new image arrived within the timeout, or
+# when the source was closed
+class NoMoreImages(Exception):
+    pass
@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+#coding=utf-8
+# Stands in for the streaming Flea3 grabber: answers each line on stdin with
+# the next of the given images, looping over them, as a binary PGM on stdout.
+# "quit" or the end of stdin stops it.
+#   python modules/stub_grabber.py sequence/*.png
+from __future__ import print_function
+import sys
+import timeit
+
+import cv2
+
+def write_pgm(stream, image, timestamp):
+    height, width = image.shape
+    header = "P5\n# time %.6f\n%d %d\n255\n" % (timestamp, width, height)
+    stream.write(header.encode('ascii'))
+    stream.write(image.tobytes())
+    stream.flush()
+
+def main(filenames):
+    images = [cv2.imread(filename, 0) for filename in filenames]
+    if len(images) == 0 or any(image is None for image in images):
+        sys.exit("Could not read the images to replay")
+    stdout = getattr(sys.stdout, 'buffer', sys.stdout)
+    i = 0
+    while True:
+        request = sys.stdin.readline()
+        if (not request) or (request.strip() == "quit"):
+            break
+        write_pgm(stdout, images[i % len(images)], timeit.default_timer())
+        i += 1
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
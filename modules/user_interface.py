@@ -17,6 +17,8 @@ import os
 import csv
 
 # from classes import ExperimentalSetup
+from read_image import open_video_source, FLEA3_GRABBER_COMMAND
+from VideoSource import sequence_pattern
 
 IMAGE_EXTENSION='.png'
 
@@ -26,7 +28,7 @@ BACKGROUND_COLOR='gray90'
 VERSION='1.1'
 
 NEEDLE_OPTIONS = ['0.7176', '1.270', '1.651']
-IMAGE_SOURCE_OPTIONS = ["Flea3", "USB camera", "Local images"]
+IMAGE_SOURCE_OPTIONS = ["Flea3", "USB camera", "Local images", "Video file", "Watched directory"]
 
 PATH_TO_SCRIPT = os.path.join(os.path.dirname(os.path.realpath(__file__)),'..')
 PATH_TO_FILE = os.path.join(os.path.dirname(os.path.realpath(__file__)),"parameters.csv")
@@ -47,6 +49,7 @@ class UserInterface(tk.Toplevel):
         self.root = tk.Tk()
         self.root.geometry("+100+100")
         self.screen_resolution = [self.root.winfo_screenwidth(), self.root.winfo_screenheight()]
+        self.grabber_command = FLEA3_GRABBER_COMMAND # kept in the parameters file, as there is no entry for it
         self.root.lift()
         self.root.call('wm', 'attributes', '.', '-topmost', True)
         self.root.after_idle(self.root.call, 'wm', 'attributes', '.', '-topmost', False)
@@ -129,7 +132,7 @@ class UserInterface(tk.Toplevel):
 
 
     def propogate_state(self, *args):
-        if self.image_source.get_value()=="Local images":
+        if self.image_source.get_value() in ["Local images", "Watched directory"]:
             self.save_images_boole.disable()
             self.create_new_dir_boole.disable()
             # self.filename_string.disable()
@@ -268,6 +271,24 @@ class UserInterface(tk.Toplevel):
         if self.image_source.get_value() == "Local images":
             user_input_data.import_files = tkFileDialog.askopenfilenames(parent = self.root, title="Select files", initialdir=PATH_TO_SCRIPT)
             user_input_data.number_of_frames = len(user_input_data.import_files)
+        elif self.image_source.get_value() == "Video file":
+            # a video, or any image of a numbered sequence
+            filename = tkFileDialog.askopenfilename(parent = self.root, title="Select video or first image", initialdir=PATH_TO_SCRIPT)
+            if not filename:
+                sys.exit()
+            user_input_data.video_filename = sequence_pattern(filename)
+            open_video_source(user_input_data)
+        elif self.image_source.get_value() == "Watched directory":
+            # images written there by another program are analysed as they land
+            directory = tkFileDialog.askdirectory(parent = self.root, title="Select directory to watch", initialdir=PATH_TO_SCRIPT)
+            if not directory:
+                sys.exit()
+            user_input_data.watch_directory = directory
+            if user_input_data.number_of_frames == 0:
+                user_input_data.number_of_frames = None # until interrupted
+        elif user_input_data.number_of_frames == 0:
+            # a camera runs until interrupted if no number of frames is given
+            user_input_data.number_of_frames = None
         # if self.create_new_dir_boole.get_value(): #create_folder_boole
         #     new_directory = os.path.join(user_input_data.directory_string, self.filename_string.get_value())
         #     os.makedirs(new_directory)
@@ -318,6 +339,9 @@ class UserInterface(tk.Toplevel):
             else:
                 self.directory.set_value(os.getcwd()) # current directory of Terminal
 
+            if len(data) > 13: # command line of the Flea3 streaming grabber, edited in the file
+                self.grabber_command = data[13][1]
+
 
     def update_user_settings(self, user_input_data):
         user_input_data.screen_resolution = self.screen_resolution
@@ -337,6 +361,7 @@ class UserInterface(tk.Toplevel):
             temp_filename = "Extracted_data"
         user_input_data.filename = temp_filename + IMAGE_EXTENSION
         user_input_data.directory_string = self.directory.get_value()
+        user_input_data.grabber_command = self.grabber_command or None
 
 
 
@@ -355,7 +380,8 @@ class UserInterface(tk.Toplevel):
         ('Save images',self.save_images_boole.get_value()),
         ('Create new data folder',self.create_new_dir_boole.get_value()),
         ('Filename',self.filename_string.get_value()),
-        ('Directory',self.directory.get_value())
+        ('Directory',self.directory.get_value()),
+        ('Grabber command',self.grabber_command)
         ])
         writer = csv.writer(open(PATH_TO_FILE, 'w'))
         for row in parameter_vector:
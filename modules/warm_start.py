@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+#coding=utf-8
+from __future__ import print_function
+from initialise_parameters import initialise_parameters
+from jacobian import fullJacobian
+
+import numpy as np
+
+# objective function (mean squared residual in px^2) above which the previous
+# frame's solution is considered a poor starting point for the next frame
+WARM_START_OBJECTIVE_TOL = 25.0
+
+# seeds the fit of each frame from the converged solution of the previous frames
+class WarmStart(object):
+    def __init__(self, extrapolate=False, objective_tol=WARM_START_OBJECTIVE_TOL):
+        self.extrapolate = extrapolate
+        self.objective_tol = objective_tol
+        self.previous_params = [] # converged parameters of the last two frames
+        self.previous_max_s = None
+        self.previous_arc_lengths = None
+
+    # sets the starting parameters, max_s and arc lengths of drop_data for the
+    # new frame - returns True if the fit was warm started and False if
+    # initialise_parameters was used instead
+    def initialise_parameters(self, experimental_drop, drop_data, tolerances):
+        if len(self.previous_params) == 0:
+            initialise_parameters(experimental_drop, drop_data)
+            return False
+        drop_data.params = self.guess_parameters()
+        drop_data.max_s = self.previous_max_s
+        arc_length_seeds = self.resample_arc_lengths(len(experimental_drop.drop_data))
+        # check the guess against the new contour before using it
+        residuals = fullJacobian(experimental_drop.drop_data, drop_data, tolerances, arc_length_seeds)[1]
+        degrees_of_freedom = len(experimental_drop.drop_data) - drop_data.parameter_dimensions + 1
+        objective_function = np.dot(residuals, residuals) / degrees_of_freedom
+        if not (objective_function < self.objective_tol):
+            print("Previous solution is a poor fit (error %.4f), reinitialising parameters" % objective_function)
+            initialise_parameters(experimental_drop, drop_data)
+            return False
+        drop_data.arc_length_seeds = arc_length_seeds
+        return True
+
+    # records the converged solution of the current frame
+    def update(self, drop_data):
+        self.previous_params = (self.previous_params + [np.array(drop_data.previous_params)])[-2:]
+        self.previous_max_s = drop_data.max_s
+        self.previous_arc_lengths = np.array(drop_data.arc_lengths)
+
+    # previous solution, or the linear extrapolation of the last two solutions
+    def guess_parameters(self):
+        if self.extrapolate and (len(self.previous_params) == 2):
+            return 2 * self.previous_params[1] - self.previous_params[0]
+        return self.previous_params[-1].copy()
+
+    # maps the previous arc lengths onto a contour with n_points points - the
+    # contours are sorted by height, so points are matched by relative position
+    def resample_arc_lengths(self, n_points):
+        n_previous = len(self.previous_arc_lengths)
+        if n_previous == n_points:
+            return self.previous_arc_lengths.copy()
+        return np.interp(np.linspace(0, 1, n_points), np.linspace(0, 1, n_previous), self.previous_arc_lengths)
@@ -18,13 +18,17 @@ from modules.PlotManager import PlotManager
 from modules.ExtractData import ExtractedData
 
 from modules.user_interface import call_user_input
-from modules.read_image import get_image
+from modules.read_image import get_image, close_capture_session, close_image_saver
+from modules.sources import NoMoreImages
 from modules.select_regions import set_regions
+from modules.analyse_drop import analyse_drop, fit_drop
 from modules.extract_profile import extract_drop_profile
-from modules.initialise_parameters import initialise_parameters
-from modules.analyse_needle import calculate_needle_diameter
-from modules.fit_data import fit_experimental_drop
 from modules.generate_data import generate_full_data
+from modules.profile_library import load_profile_library
+from modules.warm_start import WarmStart
+from modules.parallel import fit_local_images, copy_frame
+from modules.pipeline import Pipeline, QUEUE_SIZE
+from modules.scheduler import FrameScheduler
 # from modules. import add_data_to_lists
 
 
@@ -36,6 +40,7 @@ import tkFont
 
 import timeit
 import time
+import datetime
 
 np.set_printoptions(suppress=True)
 np.set_printoptions(precision=3)
@@ -48,12 +53,33 @@ ARCLENGTH_TOL = 1.e-6
 MAXIMUM_ARCLENGTH_STEPS = 10
 NEEDLE_TOL = 1.e-4
 NEEDLE_STEPS = 20
+MULTIRESOLUTION_POINTS = [] # contour points at each coarse level of the fit, e.g. [100, 300]
+MULTIRESOLUTION_TOL = 1.e-3 # relative parameter change to move to the next level
+PROJECTION = "newton" # closest points on the profile: "newton" iterations or "kdtree" projection onto a sampled profile
+SOLVER = "lmf" # least-squares solver: "lmf", "gauss_newton", "dogleg", "least_squares" (scipy) or "variable_projection"
+WARM_START = True # seed each frame from the previous frame's solution
+WARM_START_EXTRAPOLATE = False # extrapolate linearly from the last two frames
+LOCAL_IMAGES_WORKERS = 1 # number of processes fitting "Local images" in parallel
+LOCAL_IMAGES_CHUNK_SIZE = 10 # consecutive frames given to a process at a time
+PIPELINE = True # overlap acquisition, edge extraction, fitting and export of frames
+OVERLOAD_POLICY = "backlog" # "drop", "backlog" or "degrade" when frames come faster than they are fitted
+SAVE_ROI_ONLY = False # saved images: crop to the drop and needle regions
+SAVE_GRAYSCALE = False # saved images: single channel
+SAVE_ARCHIVE = False # saved images: one zip archive instead of a file per frame
+RESULTS_FORMAT = ".csv" # results file: ".csv", ".npz" (chunked columns) or ".sqlite"
+PREVIEW_REDUCTION = 1 # 2, 4 or 8 to select the regions on an image decoded at that fraction of its size (local images)
+WATCH_PATTERN = "*.png" # images analysed in a watched directory
+WATCH_ORDER = "name" # "name" or "mtime" of the images waiting in a watched directory
+WATCH_EXISTING = False # also analyse the images already in a watched directory
+WATCH_TIMEOUT = None # seconds without a new image in a watched directory before stopping, None to wait for ever
+MEMMAP_RESULTS = False # keep the fitted values in memory-mapped files next to the results instead of in memory
 
 
 
 def main():
     clear_screen()
     fitted_drop_data = DropData()
+    fitted_drop_data.profile_library = load_profile_library()
     tolerances = Tolerances(
         DELTA_TOL, 
         GRADIENT_TOL,
@@ -62,54 +88,160 @@ def main():
         ARCLENGTH_TOL,
         MAXIMUM_ARCLENGTH_STEPS,
         NEEDLE_TOL,
-        NEEDLE_STEPS)
+        NEEDLE_STEPS,
+        MULTIRESOLUTION_POINTS,
+        MULTIRESOLUTION_TOL,
+        PROJECTION,
+        SOLVER)
     user_inputs = ExperimentalSetup()
     call_user_input(user_inputs)
+    user_inputs.save_roi_only = SAVE_ROI_ONLY
+    user_inputs.save_grayscale = SAVE_GRAYSCALE
+    user_inputs.save_archive = SAVE_ARCHIVE
+    user_inputs.preview_reduction = PREVIEW_REDUCTION
+    user_inputs.watch_pattern = WATCH_PATTERN
+    user_inputs.watch_order = WATCH_ORDER
+    user_inputs.watch_existing = WATCH_EXISTING
+    user_inputs.watch_timeout = WATCH_TIMEOUT
 
-    n_frames = user_inputs.number_of_frames
-    extracted_data = ExtractedData(n_frames, fitted_drop_data.parameter_dimensions)
+    n_frames = user_inputs.number_of_frames # None to run until interrupted
+    if MEMMAP_RESULTS:
+        data_directory = os.path.join(user_inputs.directory_string, user_inputs.filename[:-4] + '_' + datetime.datetime.now().strftime("%Y-%m-%d-%H%M%S") + '_data')
+        print("Storing the fitted values in " + data_directory)
+        user_inputs.data_directory = data_directory
+    extracted_data = ExtractedData(n_frames, fitted_drop_data.parameter_dimensions, user_inputs.data_directory)
     raw_experiment = ExperimentalDrop()
+    warm_start = None
+    if WARM_START:
+        warm_start = WarmStart(WARM_START_EXTRAPOLATE)
 
+    plots = None
     if user_inputs.interfacial_tension_boole:
         plots = PlotManager(user_inputs.wait_time, n_frames)
 
     get_image(raw_experiment, user_inputs, -1)
     set_regions(raw_experiment, user_inputs)
+    wait_time = user_inputs.wait_time
+    if user_inputs.image_source == "Watched directory":
+        wait_time = 0 # each image is taken as soon as it is complete
+    scheduler = FrameScheduler(wait_time, OVERLOAD_POLICY)
+
+    try:
+        process_frames(user_inputs, tolerances, fitted_drop_data, extracted_data, warm_start, plots, scheduler)
+    finally:
+        close_capture_session(user_inputs) # release the camera
+        close_image_saver(user_inputs) # write the images still queued
+        extracted_data.close_results() # write the results still buffered
+#    cheeky_pause()
+
+# runs the analysis of all frames - in parallel processes, in a pipeline or
+# frame by frame
+def process_frames(user_inputs, tolerances, fitted_drop_data, extracted_data, warm_start, plots, scheduler):
+    n_frames = user_inputs.number_of_frames
+    if (user_inputs.image_source == "Local images") and (LOCAL_IMAGES_WORKERS > 1):
+        user_inputs.time_string = datetime.datetime.now().strftime("%Y-%m-%d-%H%M%S")
+        filename = user_inputs.filename[:-4] + '_' + user_inputs.time_string + RESULTS_FORMAT
+        export_filename = os.path.join(user_inputs.directory_string, filename)
+        for i, chunk_data, j in fit_local_images(user_inputs, tolerances, LOCAL_IMAGES_WORKERS, LOCAL_IMAGES_CHUNK_SIZE, warm_start):
+            print("\nFitted frame " + frame_label(i, n_frames))
+            copy_frame(extracted_data, i, chunk_data, j)
+            if user_inputs.interfacial_tension_boole:
+                plots.append_data_plot(extracted_data.time_IFT_vol_area(i), i)
+            extracted_data.export_data(export_filename, i)
+        return
+
+    if PIPELINE and not (user_inputs.residuals_boole or user_inputs.profiles_boole):
+        # the fitting plots have to be drawn from the main thread
+        run_pipeline(user_inputs, tolerances, fitted_drop_data, extracted_data, warm_start, plots, scheduler)
+        return
 
-    for i in range(n_frames):
-        print("\nProcessing frame %d of %d..." % (i+1, n_frames))
-        time_start = timeit.default_timer()
+    # the serial loop keeps to the schedule by dropping frames, if the policy
+    # is "drop", and otherwise captures each frame as soon as it can
+    for i in scheduler.frames(n_frames):
+        print("\nProcessing frame " + frame_label(i, n_frames) + "...")
         raw_experiment = ExperimentalDrop()
-        get_image(raw_experiment, user_inputs, i) # save image in here...
-        # extract_drop_profile(raw_experiment, user_inputs)
-        extract_drop_profile(raw_experiment, user_inputs)
+        try:
+            get_image(raw_experiment, user_inputs, i) # save image in here...
+        except NoMoreImages:
+            break
         if i == 0:
             extracted_data.initial_image_time = raw_experiment.time
-            filename = user_inputs.filename[:-4] + '_' + user_inputs.time_string + ".csv"
+            filename = user_inputs.filename[:-4] + '_' + user_inputs.time_string + RESULTS_FORMAT
             export_filename = os.path.join(user_inputs.directory_string, filename)
-        initialise_parameters(raw_experiment, fitted_drop_data)
-        calculate_needle_diameter(raw_experiment, fitted_drop_data, tolerances)
-        # fit_experimental_drop(raw_experiment, fitted_drop_data, tolerances)
-        fit_experimental_drop(raw_experiment, fitted_drop_data, user_inputs, tolerances)
+        analyse_drop(raw_experiment, fitted_drop_data, user_inputs, tolerances, warm_start)
         generate_full_data(extracted_data, raw_experiment, fitted_drop_data, user_inputs, i)
+        scheduler.frame_fitted()
+        extracted_data.record_schedule(i, scheduler.missed_deadlines, scheduler.backlog())
         data_vector = extracted_data.time_IFT_vol_area(i)
         if user_inputs.interfacial_tension_boole:
             plots.append_data_plot(data_vector, i)
-        if i != (n_frames - 1):
-            time_loop = timeit.default_timer() - time_start
-            pause_wait_time(time_loop, user_inputs.wait_time)
         extracted_data.export_data(export_filename,i)
-#    cheeky_pause()
+
+# processes the frames in a pipeline of acquisition, edge extraction, fitting
+# and export threads, while the physical quantities are plotted here - the
+# queue of full frames from the acquisition is always bounded, and under the
+# "drop" policy so are the later queues, where a full queue delays the
+# acquisition until frames are dropped. Otherwise the frames waiting to be
+# fitted queue without bound, but only as their contours (tens of kB a frame,
+# the image being released once the edges are extracted).
+def run_pipeline(user_inputs, tolerances, fitted_drop_data, extracted_data, warm_start, plots, scheduler):
+    n_frames = user_inputs.number_of_frames
+    export_filename = []
+
+    def extract(frame):
+        i, raw_experiment = frame
+        extract_drop_profile(raw_experiment, user_inputs) # also releases the image
+        return frame
+
+    def fit(frame):
+        i, raw_experiment = frame
+        print("\nFitting frame " + frame_label(i, n_frames) + "...")
+        if i == 0:
+            extracted_data.initial_image_time = raw_experiment.time
+        fit_drop(raw_experiment, fitted_drop_data, user_inputs, scheduler.fitting_tolerances(tolerances), warm_start)
+        generate_full_data(extracted_data, raw_experiment, fitted_drop_data, user_inputs, i)
+        scheduler.frame_fitted()
+        extracted_data.record_schedule(i, scheduler.missed_deadlines, scheduler.backlog())
+        return frame
+
+    def export(frame):
+        i, raw_experiment = frame
+        if i == 0:
+            filename = user_inputs.filename[:-4] + '_' + user_inputs.time_string + RESULTS_FORMAT
+            export_filename.append(os.path.join(user_inputs.directory_string, filename))
+        extracted_data.export_data(export_filename[0], i)
+        return frame
+
+    contour_queue_size = QUEUE_SIZE if scheduler.policy == "drop" else 0
+    pipeline = Pipeline(acquire_frames(user_inputs, scheduler, n_frames), [["extraction", extract], ["fitting", fit], ["export", export]],
+                        [QUEUE_SIZE, contour_queue_size, contour_queue_size, contour_queue_size])
+    for i, raw_experiment in pipeline.run():
+        print("Frame %d done, queued: %s" % (i+1, ", ".join("%s %d" % (name, depth) for name, depth in pipeline.queue_depths())))
+        if plots is not None:
+            plots.append_data_plot(extracted_data.time_IFT_vol_area(i), i)
+    pipeline.print_statistics()
+    print("Missed deadlines: %d (%d frames dropped)" % (scheduler.missed_deadlines, scheduler.dropped_frames))
+
+# captures the frames at the deadlines of the scheduler - the image times are
+# taken at capture, so the interval is kept however long the later stages take
+def acquire_frames(user_inputs, scheduler, n_frames):
+    for i in scheduler.frames(n_frames):
+        raw_experiment = ExperimentalDrop()
+        try:
+            get_image(raw_experiment, user_inputs, i)
+        except NoMoreImages:
+            return
+        yield [i, raw_experiment]
+
+# "i+1 of n_frames", or just "i+1" for a run without a set number of frames
+def frame_label(i, n_frames):
+    if n_frames is None:
+        return "%d" % (i+1)
+    return "%d of %d" % (i+1, n_frames)
 
 def clear_screen():
     os.system('cls' if os.name == 'nt' else 'clear')
 
-def pause_wait_time(elapsed_time, requested_time):
-    if elapsed_time > requested_time:
-        print('WARNING: Fitting took longer than desired wait time')
-    else:
-        time.sleep(requested_time - elapsed_time)
-
 def cheeky_pause():
     import Tkinter
     import tkMessageBox
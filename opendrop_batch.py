@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+#coding=utf-8
+# Headless batch processing of locally stored images or videos, or of images
+# as they are written into a watched directory - no Tk or matplotlib
+#
+# Usage:
+#     python opendrop_batch.py opendrop_batch.cfg
+from __future__ import unicode_literals
+from __future__ import print_function
+
+from modules.classes import ExperimentalDrop, DropData
+from modules.ExtractData import ExtractedData
+from modules.batch_config import read_batch_config
+from modules.read_image import get_image, close_capture_session, close_image_saver
+from modules.analyse_drop import analyse_drop
+from modules.generate_data import generate_full_data
+from modules.profile_library import load_profile_library
+from modules.parallel import fit_local_images, copy_frame
+from modules.sources import NoMoreImages
+
+import argparse
+import itertools
+import numpy as np
+
+np.set_printoptions(suppress=True)
+np.set_printoptions(precision=3)
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit pendant drop images without the graphical interface")
+    parser.add_argument('config', help="batch configuration file (see opendrop_batch.cfg)")
+    args = parser.parse_args()
+
+    user_inputs, tolerances, warm_start = read_batch_config(args.config)
+    fitted_drop_data = DropData()
+    fitted_drop_data.profile_library = load_profile_library()
+
+    n_frames = user_inputs.number_of_frames
+    extracted_data = ExtractedData(n_frames, fitted_drop_data.parameter_dimensions, user_inputs.data_directory)
+    try:
+        if (user_inputs.image_source == "Local images") and (user_inputs.number_of_workers > 1):
+            for i, chunk_data, j in fit_local_images(user_inputs, tolerances, user_inputs.number_of_workers, user_inputs.chunk_size, warm_start):
+                copy_frame(extracted_data, i, chunk_data, j)
+                extracted_data.export_data(user_inputs.output_filename, i)
+            return
+        # a watched directory has no set number of frames
+        for i in (itertools.count() if n_frames is None else range(n_frames)):
+            if n_frames is None:
+                print("\nWaiting for frame %d..." % (i+1))
+            else:
+                print("\nProcessing frame %d of %d..." % (i+1, n_frames))
+            raw_experiment = ExperimentalDrop()
+            try:
+                get_image(raw_experiment, user_inputs, i)
+            except NoMoreImages:
+                break
+            if i == 0:
+                extracted_data.initial_image_time = raw_experiment.time
+            analyse_drop(raw_experiment, fitted_drop_data, user_inputs, tolerances, warm_start)
+            generate_full_data(extracted_data, raw_experiment, fitted_drop_data, user_inputs, i)
+            extracted_data.export_data(user_inputs.output_filename, i)
+    finally:
+        close_capture_session(user_inputs) # stop decoding the video or watching the directory
+        close_image_saver(user_inputs) # write the images still queued
+        extracted_data.close_results() # write the results still buffered
+
+if __name__ == '__main__':
+    main()